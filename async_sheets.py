@@ -0,0 +1,276 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config import SHEETS_MAX_WORKERS, SHEETS_MAX_QUEUE, PROJECTS_SHEET, NOTES_SHEET, TASKS_SHEET
+from metrics import METRICS, report_error
+from search_index import FIELDS, InvertedIndex, search
+from task_stats import TaskStats
+
+
+class AsyncSheetsManager:
+    """Асинхронная обертка над хранилищем (SheetsManager или SQLiteStorage).
+
+    Синхронные вызовы gspread/SQLite выполняются в ограниченном пуле потоков,
+    поэтому event loop бота не блокируется на время запросов к Google Sheets.
+    """
+
+    def __init__(self, manager, max_workers=SHEETS_MAX_WORKERS, max_queue=SHEETS_MAX_QUEUE):
+        self.manager = manager
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sheets')
+        # Семафор создается лениво, внутри работающего event loop
+        self._slots = None
+        # Поисковые индексы по листам и версии данных, которые они отражают
+        self._indexes = {}
+        self._indexed = {}
+        self._index_lock = None
+        # Подписчики на изменения: callback(событие, запись)
+        self._observers = []
+        # Счетчики задач по проектам для /dashboard и версия листа задач, которую они отражают
+        self._stats = None
+        self._stats_version = None
+
+    async def _run(self, func, *args, **kwargs):
+        """Выполнить синхронный метод в пуле потоков"""
+        if self._slots is None:
+            # Одновременно: max_workers выполняются + max_queue ждут в очереди пула,
+            # остальные вызовы ждут здесь, не раздувая очередь исполнителя
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        queued_at = time.perf_counter()
+
+        def call():
+            # Время ожидания в очереди и время выполнения метода учитываются отдельно
+            METRICS.observe('storage_queue_wait', func.__name__, (time.perf_counter() - queued_at) * 1000)
+            with METRICS.timer('storage_call', func.__name__):
+                return func(*args, **kwargs)
+
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, call)
+
+    async def connect(self):
+        """Подключить хранилище в пуле потоков"""
+        await self._run(self.manager.connect)
+
+    def shutdown(self, wait=True):
+        """Остановить пул потоков и записать отложенные изменения"""
+        self._executor.shutdown(wait=wait)
+        self.manager.close()
+
+    def data_version(self, sheet_name):
+        """Версия данных листа (без обращения к пулу: это чтение счетчика)"""
+        return self.manager.data_version(sheet_name)
+
+    def cache_stats(self):
+        """Статистика кэша записей (без обращения к Google Sheets)"""
+        return self.manager.cache_stats()
+
+    async def load_records(self, sheet_name):
+        """Все записи листа; ошибка чтения пробрасывается"""
+        return await self._run(self.manager.load_records, sheet_name)
+
+    # Постраничное чтение
+    async def get_projects_page(self, offset, limit):
+        return await self._run(self.manager.get_projects_page, offset, limit)
+
+    async def get_tasks_page(self, offset, limit):
+        return await self._run(self.manager.get_tasks_page, offset, limit)
+
+    async def get_notes_page(self, offset, limit):
+        return await self._run(self.manager.get_notes_page, offset, limit)
+
+    async def get_secrets_page(self, offset, limit):
+        return await self._run(self.manager.get_secrets_page, offset, limit)
+
+    def subscribe(self, callback):
+        """Получать события 'task_added' (запись задачи) и 'task_status' (ID и Status)"""
+        self._observers.append(callback)
+
+    def _notify(self, event, record):
+        if self._stats is not None:
+            self._stats.on_change(event, record)
+        for callback in self._observers:
+            callback(event, record)
+
+    # Сводка по проектам
+    async def task_stats(self):
+        """Счетчики задач по проектам (TaskStats); лист читается, только если менялся не через эту обертку"""
+        if self._index_lock is None:
+            self._index_lock = asyncio.Lock()
+        async with self._index_lock:
+            version = self.manager.data_version(TASKS_SHEET)
+            if self._stats_version != version:
+                try:
+                    self._stats = await self._run(self._build_stats, self.manager.load_records)
+                except Exception as e:
+                    # Версию не запоминаем: следующий запрос попробует прочитать лист снова
+                    report_error('task_stats', f"Ошибка подсчета задач: {e}")
+                    return self._stats or TaskStats()
+                self._stats_version = version
+        return self._stats
+
+    @staticmethod
+    def _build_stats(load):
+        return TaskStats(load(TASKS_SHEET))
+
+    # Поиск
+    async def search(self, query, limit=10, sheets=(NOTES_SHEET, TASKS_SHEET)):
+        """Записи листов sheets по словам запроса (целиком или префиксом): [(оценка, лист, запись)]"""
+        if self._index_lock is None:
+            self._index_lock = asyncio.Lock()
+        async with self._index_lock:
+            for sheet_name in sheets:
+                # Версию запоминаем до чтения: запись во время построения вызовет перестройку
+                version = self.manager.data_version(sheet_name)
+                if self._indexed.get(sheet_name) == version:
+                    continue
+                try:
+                    self._indexes[sheet_name] = await self._run(self._build_index, sheet_name, self.manager.load_records)
+                except Exception as e:
+                    # Версию не запоминаем: следующий поиск попробует прочитать лист снова
+                    report_error('search_index', f"Ошибка построения поискового индекса {sheet_name}: {e}")
+                    continue
+                self._indexed[sheet_name] = version
+        return search({sheet_name: self._indexes[sheet_name] for sheet_name in sheets if sheet_name in self._indexes},
+                      query, limit)
+
+    @staticmethod
+    def _build_index(sheet_name, load):
+        return InvertedIndex(FIELDS[sheet_name], load(sheet_name))
+
+    def _written(self, sheet_name, before, records=()):
+        """Учесть запись через эту обертку в поисковом индексе и счетчиках без перестройки.
+
+        Если между чтением версии и записью лист менялся еще кем-то,
+        индекс и счетчики остаются устаревшими и будут перестроены при следующем чтении.
+        """
+        after = self.manager.data_version(sheet_name)
+        if sheet_name == TASKS_SHEET and self._stats_version == before and after == before + 1:
+            # Сами счетчики обновятся событием в _notify
+            self._stats_version = after
+        index = self._indexes.get(sheet_name)
+        if index is None or self._indexed.get(sheet_name) != before:
+            return
+        for record in records:
+            index.add(record)
+        if after == before + 1:
+            self._indexed[sheet_name] = after
+
+    def _status_written(self, before, task_ids, status):
+        """Учесть смену статуса задач: по статусу не ищут, но inline-ответы показывают его из индекса"""
+        index = self._indexes.get(TASKS_SHEET)
+        if index is not None:
+            for task_id in task_ids:
+                record = index.records.get(task_id)
+                if record is None and str(task_id).isdigit():
+                    record = index.records.get(int(task_id))
+                if record is not None:
+                    index.records[record['ID']] = dict(record, Status=status)
+        self._written(TASKS_SHEET, before)
+
+    # PROJECTS
+    async def get_projects(self):
+        return await self._run(self.manager.get_projects)
+
+    async def get_project(self, project_id):
+        return await self._run(self.manager.get_project, project_id)
+
+    async def add_project(self, name, description=""):
+        before = self.manager.data_version(PROJECTS_SHEET)
+        project_id = await self._run(self.manager.add_project, name, description)
+        if project_id:
+            self._written(PROJECTS_SHEET, before, [{
+                'ID': project_id, 'Name': name, 'Description': description,
+                'Created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'Status': 'active',
+            }])
+        return project_id
+
+    async def delete_project(self, project_id):
+        return await self._run(self.manager.delete_project, project_id)
+
+    # TASKS
+    async def get_tasks(self, project_name=None):
+        return await self._run(self.manager.get_tasks, project_name)
+
+    async def add_task(self, project, title, description="", priority="medium", deadline=""):
+        before = self.manager.data_version(TASKS_SHEET)
+        task_id = await self._run(self.manager.add_task, project, title, description, priority, deadline)
+        if task_id:
+            record = {
+                'ID': task_id, 'Project': project, 'Title': title, 'Description': description,
+                'Status': 'todo', 'Priority': priority, 'Deadline': deadline,
+                'Created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self._written(TASKS_SHEET, before, [record])
+            self._notify('task_added', record)
+        return task_id
+
+    async def add_tasks(self, tasks):
+        before = self.manager.data_version(TASKS_SHEET)
+        task_ids = await self._run(self.manager.add_tasks, tasks)
+        if task_ids:
+            created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            records = [
+                {'ID': task_id, 'Project': project, 'Title': title, 'Description': description,
+                 'Status': 'todo', 'Priority': priority, 'Deadline': deadline, 'Created': created}
+                for task_id, (project, title, description, priority, deadline) in zip(task_ids, tasks)
+                if task_id
+            ]
+            self._written(TASKS_SHEET, before, records)
+            for record in records:
+                self._notify('task_added', record)
+        return task_ids
+
+    async def update_task_status(self, task_id, status):
+        before = self.manager.data_version(TASKS_SHEET)
+        updated = await self._run(self.manager.update_task_status, task_id, status)
+        if updated:
+            self._status_written(before, [task_id], status)
+            self._notify('task_status', {'ID': task_id, 'Status': status})
+        return updated
+
+    async def update_tasks_status(self, task_ids, status):
+        before = self.manager.data_version(TASKS_SHEET)
+        updated = await self._run(self.manager.update_tasks_status, task_ids, status)
+        if updated:
+            self._status_written(before, updated, status)
+            for task_id in updated:
+                self._notify('task_status', {'ID': task_id, 'Status': status})
+        return updated
+
+    # ARCHIVE
+    async def archive_tasks(self, before):
+        # Лист задач меняется целиком — индекс и счетчики перестроятся при следующем чтении
+        return await self._run(self.manager.archive_tasks, before)
+
+    async def get_archived_tasks(self, project_name=None):
+        return await self._run(self.manager.get_archived_tasks, project_name)
+
+    async def get_archived_task(self, task_id):
+        return await self._run(self.manager.get_archived_task, task_id)
+
+    # NOTES
+    async def get_notes(self, project_name=None):
+        return await self._run(self.manager.get_notes, project_name)
+
+    async def add_note(self, title, content, tags="", project=""):
+        before = self.manager.data_version(NOTES_SHEET)
+        note_id = await self._run(self.manager.add_note, title, content, tags, project)
+        if note_id:
+            self._written(NOTES_SHEET, before, [{
+                'ID': note_id, 'Title': title, 'Content': content, 'Tags': tags,
+                'Created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'Project': project,
+            }])
+        return note_id
+
+    # SECRETS
+    async def get_secrets(self):
+        return await self._run(self.manager.get_secrets)
+
+    async def add_secret(self, name, description="", data=""):
+        return await self._run(self.manager.add_secret, name, description, data)
+
+    async def encrypt_secrets(self):
+        return await self._run(self.manager.encrypt_secrets)
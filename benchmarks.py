@@ -0,0 +1,207 @@
+"""Микробенчмарки SheetsManager на поддельной таблице.
+
+Запуск: python benchmarks.py [--sizes 100 1000 10000] [--latency 0.3] [--sleep] [--users 1 5 20]
+
+Для каждой операции выводится число запросов к API, объем данных,
+имитируемая задержка (запросы * latency) и реальное время выполнения.
+Затем — время поиска (/search и inline-режим), скорость шифрования
+секретов и пропускная способность обработки обновлений N пользователей
+по одному и через ChatOrderedUpdateProcessor.
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+from config import PROJECTS_SHEET, TASKS_SHEET, NOTES_SHEET, SECRETS_SHEET, INLINE_RESULTS
+from fake_sheets import FakeSpreadsheet
+from rate_limiter import RateLimiter
+from sheets_manager import SheetsManager
+from search_index import FIELDS, InvertedIndex, search
+from storage import HEADERS
+from update_processor import ChatOrderedUpdateProcessor
+from views import render_inline
+import secrets_crypto
+
+
+def make_spreadsheet(size, latency=0.0, sleep=False):
+    """Таблица с size задачами и заметками, size // 10 проектами и секретами"""
+    spreadsheet = FakeSpreadsheet(latency, sleep)
+    projects = max(size // 10, 1)
+    spreadsheet.seed(PROJECTS_SHEET, [HEADERS[PROJECTS_SHEET]] + [
+        [i, f'Проект {i}', f'Описание {i}', '2024-01-01 00:00:00', 'active']
+        for i in range(1, projects + 1)
+    ])
+    spreadsheet.seed(TASKS_SHEET, [HEADERS[TASKS_SHEET]] + [
+        [i, f'Проект {i % projects + 1}', f'Задача {i}', 'Описание задачи', 'todo', 'medium',
+         '2024-12-31', '2024-01-01 00:00:00']
+        for i in range(1, size + 1)
+    ])
+    spreadsheet.seed(NOTES_SHEET, [HEADERS[NOTES_SHEET]] + [
+        [i, f'Заметка {i}', 'Текст заметки ' * 5, 'тег', '2024-01-01 00:00:00', f'Проект {i % projects + 1}']
+        for i in range(1, size + 1)
+    ])
+    spreadsheet.seed(SECRETS_SHEET, [HEADERS[SECRETS_SHEET]] + [
+        [i, f'Секрет {i}', '', '2024-01-01 00:00:00', 'login:password']
+        for i in range(1, max(size // 10, 1) + 1)
+    ])
+    return spreadsheet
+
+
+def scenarios(size):
+    """Операции в порядке выполнения: (название, функция от manager)"""
+    return [
+        ('connect', lambda m: m.connect()),
+        ('get_tasks_page (холодный)', lambda m: m.get_tasks_page(size // 2, 10)),
+        ('get_tasks_page (следующая)', lambda m: m.get_tasks_page(size // 2 + 10, 10)),
+        ('get_projects (холодный)', lambda m: m.get_projects()),
+        ('get_projects (теплый)', lambda m: m.get_projects()),
+        ('get_project', lambda m: m.get_project(max(size // 20, 1))),
+        ('get_projects (устарел, без правок)', lambda m: (m.cache.expire(), m.get_projects())),
+        ('get_projects (устарел, правка)', lambda m: (m.cache.expire(), m.sheet.edit(PROJECTS_SHEET, 2, 2, 'Проект 1*'),
+                                                      m.get_projects())),
+        ('get_tasks(project) (холодный)', lambda m: m.get_tasks('Проект 1')),
+        ('get_tasks(project) (теплый)', lambda m: m.get_tasks('Проект 1')),
+        ('add_task', lambda m: m.add_task('Проект 1', 'Новая задача')),
+        ('add_tasks (500 задач)', lambda m: m.add_tasks([('Проект 1', f'Импорт {i}', '', 'medium', '')
+                                                        for i in range(500)])),
+        ('update_task_status', lambda m: m.update_task_status(size // 2, 'done')),
+        ('update_task_status (повтор)', lambda m: m.update_task_status(size // 2, 'in_progress')),
+        ('update_tasks_status (50 задач)', lambda m: m.update_tasks_status(range(1, size, max(size // 50, 1)), 'done')),
+        ('archive_tasks (50 выполненных)', lambda m: m.archive_tasks('2025-01-01')),
+        ('get_tasks (после архивации)', lambda m: m.get_tasks()),
+        ('add_project', lambda m: m.add_project('Новый проект')),
+        ('delete_project', lambda m: m.delete_project(1)),
+        ('get_notes (холодный)', lambda m: m.get_notes()),
+        ('add_note', lambda m: m.add_note('Заголовок', 'Текст')),
+        ('get_secrets (холодный)', lambda m: m.get_secrets()),
+        ('add_secret', lambda m: m.add_secret('Имя', 'Описание', 'данные')),
+    ]
+
+
+def run(size, latency=0.0, sleep=False):
+    """Выполнить сценарии на таблице заданного размера, вернуть строки отчета"""
+    spreadsheet = make_spreadsheet(size, latency, sleep)
+    # Квоты не ограничивают: измеряется стоимость самих операций
+    unlimited = RateLimiter(reads_per_min=10 ** 9, writes_per_min=10 ** 9, burst=10 ** 9)
+    manager = SheetsManager(spreadsheet=spreadsheet, limiter=unlimited)
+    results = []
+    for name, action in scenarios(size):
+        spreadsheet.stats.reset()
+        started = time.perf_counter()
+        action(manager)
+        wall = time.perf_counter() - started
+        stats = spreadsheet.stats
+        results.append((name, size, stats.calls, stats.bytes, stats.simulated, wall))
+    manager.close()
+    return results
+
+
+def run_search(size, queries=('заметка 150', 'задача 1999', 'зам', 'описание задачи'),
+               inline_queries=('про', 'проект 7', 'зад 19')):
+    """Построение поисковых индексов и время ответа на /search и inline-запросы, мс"""
+    spreadsheet = make_spreadsheet(size)
+    records = {}
+    for sheet_name in FIELDS:
+        headers, *rows = spreadsheet.worksheet(sheet_name).get_all_values()
+        records[sheet_name] = [dict(zip(headers, row)) for row in rows]
+    started = time.perf_counter()
+    indexes = {sheet_name: InvertedIndex(FIELDS[sheet_name], records[sheet_name]) for sheet_name in FIELDS}
+    results = [('построение индекса', (time.perf_counter() - started) * 1000)]
+    for query in queries:
+        started = time.perf_counter()
+        search({sheet_name: indexes[sheet_name] for sheet_name in (NOTES_SHEET, TASKS_SHEET)}, query)
+        results.append((f'/search {query}', (time.perf_counter() - started) * 1000))
+    for query in inline_queries:
+        started = time.perf_counter()
+        render_inline(search({sheet_name: indexes[sheet_name] for sheet_name in (PROJECTS_SHEET, TASKS_SHEET)},
+                             query, INLINE_RESULTS))
+        results.append((f'@бот {query}', (time.perf_counter() - started) * 1000))
+    return results
+
+
+async def _process_updates(users, per_user, latency, limit, decreasing=False):
+    """Обработать per_user обновлений от каждого из users чатов; (секунд, порядок соблюден).
+
+    decreasing=True: первые обновления чата обрабатываются дольше последующих,
+    так что без упорядочивания по чату поздние обновления обгоняют ранние.
+    """
+    processor = ChatOrderedUpdateProcessor(limit)
+    seen = {user: [] for user in range(users)}
+
+    async def handler(user, n):
+        # Запрос к хранилищу
+        await asyncio.sleep(latency * (per_user - n) / per_user if decreasing else latency)
+        seen[user].append(n)
+
+    async with processor:
+        started = time.perf_counter()
+        # Как Application: задача на каждое обновление в порядке поступления
+        await asyncio.gather(*(
+            processor.process_update(SimpleNamespace(effective_chat=SimpleNamespace(id=user)), handler(user, n))
+            for n in range(per_user) for user in range(users)
+        ))
+        elapsed = time.perf_counter() - started
+    return elapsed, all(order == list(range(per_user)) for order in seen.values())
+
+
+def run_updates(users, per_user=5, latency=0.05):
+    """Пропускная способность обработки обновлений: по одному и параллельно"""
+    total = users * per_user
+    sequential, _ = asyncio.run(_process_updates(users, per_user, latency, 1))
+    concurrent, ordered = asyncio.run(_process_updates(users, per_user, latency, users))
+    return total / sequential, total / concurrent, ordered
+
+
+def run_crypto(count=10000, passphrase='benchmark-passphrase', salt='benchmark-salt'):
+    """Вывод ключа (первый и повторный вызов) и шифрование/расшифровка секретов, мкс на запись"""
+    results = []
+    started = time.perf_counter()
+    secrets_crypto.derive_key(passphrase, salt)
+    results.append(('вывод ключа (scrypt)', (time.perf_counter() - started) * 1e6))
+    started = time.perf_counter()
+    secrets_crypto.derive_key(passphrase, salt)
+    results.append(('вывод ключа (из кэша)', (time.perf_counter() - started) * 1e6))
+
+    values = [f'login{i}:password-{i}' for i in range(count)]
+    started = time.perf_counter()
+    sealed = [secrets_crypto.encrypt(value, passphrase, salt) for value in values]
+    results.append(('encrypt', (time.perf_counter() - started) * 1e6 / count))
+    started = time.perf_counter()
+    opened = [secrets_crypto.decrypt(value, passphrase, salt) for value in sealed]
+    results.append(('decrypt', (time.perf_counter() - started) * 1e6 / count))
+    assert opened == values
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--latency', type=float, default=0.3, help='задержка одного запроса, секунд')
+    parser.add_argument('--sleep', action='store_true', help='реально ждать задержку')
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 5, 20],
+                        help='число одновременных пользователей для замера обработки обновлений')
+    args = parser.parse_args()
+
+    print(f"{'операция':<38}{'строк':>8}{'запросы':>9}{'КБ':>10}{'задержка, мс':>14}{'время, мс':>11}")
+    for size in args.sizes:
+        for name, rows, calls, size_bytes, simulated, wall in run(size, args.latency, args.sleep):
+            print(f"{name:<38}{rows:>8}{calls:>9}{size_bytes / 1024:>10.1f}{simulated * 1000:>14.0f}{wall * 1000:>11.2f}")
+        print()
+
+    for size in args.sizes:
+        for name, ms in run_search(size):
+            print(f"{name:<38}{size:>8}{ms:>11.2f} мс")
+    print()
+
+    for name, us in run_crypto():
+        print(f"{name:<38}{us:>12.1f} мкс")
+    print()
+
+    print(f"{'пользователей':<16}{'по одному, обн/с':>18}{'параллельно, обн/с':>20}{'ускорение':>11}{'порядок':>9}")
+    for users in args.users:
+        sequential, concurrent, ordered = run_updates(users)
+        print(f"{users:<16}{sequential:>18.1f}{concurrent:>20.1f}{concurrent / sequential:>10.1f}x{'ok' if ordered else 'НАРУШЕН':>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,31 @@
+import asyncio
+import io
 import logging
 import os
+import re
+import time
+from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
-from config import BOT_TOKEN
+from telegram.error import BadRequest
+from telegram.ext import (Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler,
+                          InlineQueryHandler)
+from config import (BOT_TOKEN, STORAGE_BACKEND, SQLITE_PATH, SHEETS_MIRROR, ADMIN_IDS,
+                    METRICS_HOST, METRICS_PORT, PAGE_SIZE, IMPORT_MAX_TASKS, IMPORT_MAX_BYTES,
+                    INLINE_RESULTS, INLINE_CACHE_TIME, ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL,
+                    PROJECTS_SHEET, TASKS_SHEET, NOTES_SHEET, SECRETS_SHEET)
 from sheets_manager import SheetsManager
+from sqlite_storage import SQLiteStorage
+from sheets_mirror import SheetsMirror
+from async_sheets import AsyncSheetsManager
+from update_processor import ChatOrderedUpdateProcessor
+from telegram_sender import SENDER
+from reminders import DeadlineReminders
+from task_import import parse_blocks, parse_csv, collect, is_csv, CSVFormatError
+from secrets_crypto import warm_up as warm_up_secrets
+from metrics import METRICS, timed, start_metrics_server
+from views import (VIEWS, INLINE_VIEWS, render_projects, render_tasks, render_project_tasks,
+                   render_archived_tasks, render_archived_task, render_notes, render_secrets,
+                   render_search, render_inline, render_dashboard, split_message)
 
 # Настройка логирования
 logging.basicConfig(
@@ -12,14 +34,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Инициализация менеджера Google Sheets
-sheets_manager = SheetsManager()
+# Момент запуска процесса — для замера времени готовности
+STARTED_AT = time.monotonic()
+
+
+
+def create_storage():
+    """Хранилище по настройке STORAGE_BACKEND"""
+    if STORAGE_BACKEND == 'sheets':
+        return SheetsManager()
+    return SQLiteStorage(SQLITE_PATH, mirror=SheetsMirror(SheetsManager()) if SHEETS_MIRROR else None)
+
+
+# Инициализация хранилища (вызовы выполняются в пуле потоков,
+# подключение — в фоне после старта бота)
+sheets_manager = AsyncSheetsManager(create_storage())
+
+# Напоминания о дедлайнах задач
+reminders = DeadlineReminders()
 
 # Порт для сервера
 PORT = int(os.environ.get('PORT', 8000))
 
 
 # Главное меню
+@timed('handler', 'show_main_menu')
 async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать главное меню"""
     keyboard = [
@@ -27,174 +66,137 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [InlineKeyboardButton("✅ Задачи", callback_data='tasks')],
         [InlineKeyboardButton("📝 Заметки", callback_data='notes')],
         [InlineKeyboardButton("🔐 Секреты", callback_data='secrets')],
+        [InlineKeyboardButton("📊 Сводка", callback_data='dashboard')],
         [InlineKeyboardButton("➕ Создать проект", callback_data='create_project')],
         [InlineKeyboardButton("➕ Добавить задачу", callback_data='select_project_for_task')],
         [InlineKeyboardButton("➕ Добавить заметку", callback_data='add_note')],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(
-                "🏠 Главное меню\n\nВыберите действие:",
-                reply_markup=reply_markup
-            )
-        except:
-            await update.callback_query.message.reply_text(
-                "🏠 Главное меню\n\nВыберите действие:",
-                reply_markup=reply_markup
-            )
-    else:
-        await update.message.reply_text(
-            "🏠 Главное меню\n\nВыберите действие:",
-            reply_markup=reply_markup
-        )
+    await SENDER.show(update, "🏠 Главное меню\n\nВыберите действие:", reply_markup)
 
 
+@timed('handler', 'start')
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /start"""
     await show_main_menu(update, context)
 
 
+# Показ экрана из views
+async def send_view(update: Update, chunks, markup):
+    """Первая часть заменяет сообщение с кнопками, остальные — новыми сообщениями"""
+    last = len(chunks) - 1
+    for i, chunk in enumerate(chunks):
+        reply_markup = markup if i == last else None
+        if i == 0:
+            await SENDER.show(update, chunk, reply_markup)
+        else:
+            await SENDER.reply(update.effective_message, chunk, reply_markup)
+
+
 # Проекты
-async def projects_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Список проектов"""
-    projects = sheets_manager.get_projects()
+@timed('handler', 'projects_list')
+async def projects_list(update: Update, context: ContextTypes.DEFAULT_TYPE, page=0):
+    """Список проектов (постранично)"""
+    async def render():
+        projects, total = await sheets_manager.get_projects_page(page * PAGE_SIZE, PAGE_SIZE)
+        return render_projects(projects, page, total)
 
-    if not projects:
-        message = "📭 Нет проектов. Создайте первый!"
-        keyboard = [
-            [InlineKeyboardButton("➕ Создать проект", callback_data='create_project')],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
-        ]
-    else:
-        message = "📁 Ваши проекты:\n\n"
-        for project in projects:
-            message += f"🔹 {project['ID']}. {project['Name']}\n"
-            if project['Description']:
-                message += f"   {project['Description']}\n"
-            message += "\n"
+    chunks, reply_markup = await VIEWS.get_or_render(
+        ('projects', page), sheets_manager.data_version(PROJECTS_SHEET), render)
+    await send_view(update, chunks, reply_markup)
 
-        # Кнопки для каждого проекта + главное меню
-        keyboard = []
-        for project in projects[:10]:  # Ограничим 10 проектами
-            keyboard.append([InlineKeyboardButton(
-                f"📝 {project['Name']}",
-                callback_data=f'project_tasks_{project["ID"]}'
-            )])
 
-        keyboard.append([InlineKeyboardButton("➕ Создать проект", callback_data='create_project')])
-        keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')])
+# Задачи
+@timed('handler', 'tasks_list')
+async def tasks_list(update: Update, context: ContextTypes.DEFAULT_TYPE, page=0):
+    """Список всех задач (постранично)"""
+    async def render():
+        tasks, total = await sheets_manager.get_tasks_page(page * PAGE_SIZE, PAGE_SIZE)
+        return render_tasks(tasks, page, total)
+
+    chunks, reply_markup = await VIEWS.get_or_render(
+        ('tasks', page), sheets_manager.data_version(TASKS_SHEET), render)
+    await send_view(update, chunks, reply_markup)
+
+
+# Архив задач проекта
+@timed('handler', 'project_archive')
+async def project_archive(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Выполненные задачи проекта, перенесенные в архив (лист читается только здесь)"""
+    query = update.callback_query
+    project_id = query.data.split('_')[2]
+    project = await sheets_manager.get_project(project_id)
+    if not project:
+        await SENDER.answer(query, "Проект не найден")
+        return
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    tasks = await sheets_manager.get_archived_tasks(project['Name'])
+    text, keyboard = render_archived_tasks(project_id, project['Name'], tasks)
+    await send_view(update, split_message(text), InlineKeyboardMarkup(keyboard))
 
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(message, reply_markup=reply_markup)
-        except:
-            await update.callback_query.message.reply_text(message, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(message, reply_markup=reply_markup)
 
+@timed('handler', 'archive')
+async def archive_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /archive <ID>: задача из архива"""
+    if not context.args or not context.args[0].isdigit():
+        await SENDER.reply(update.message, "Использование: /archive <ID задачи>\n"
+                                           "Архив проекта — кнопка «🗄 Архив проекта» в списке его задач")
+        return
 
-# Задачи
-async def tasks_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Список всех задач"""
-    tasks = sheets_manager.get_tasks()
+    task = await sheets_manager.get_archived_task(context.args[0])
+    if task is None:
+        await SENDER.reply(update.message, f"❌ Задачи {context.args[0]} нет в архиве")
+        return
+    await SENDER.reply(update.message, render_archived_task(task))
 
-    if not tasks:
-        message = "📭 Нет задач. Создайте первую!"
-        keyboard = [
-            [InlineKeyboardButton("➕ Добавить задачу", callback_data='select_project_for_task')],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
-        ]
-    else:
-        # Группировка по проектам
-        projects = {}
-        for task in tasks:
-            project = task['Project']
-            if project not in projects:
-                projects[project] = []
-            projects[project].append(task)
-
-        message = "✅ Ваши задачи:\n\n"
-        for project, project_tasks in projects.items():
-            message += f"📁 {project}:\n"
-            for task in project_tasks[:5]:  # Ограничим 5 задачами на проект
-                status_icon = "✅" if task['Status'] == 'done' else "⏳" if task['Status'] == 'in_progress' else "📝"
-                priority_icon = "🔴" if task['Priority'] == 'high' else "🟡" if task['Priority'] == 'medium' else "🟢"
-                message += f"  {status_icon} {priority_icon} {task['ID']}. {task['Title']}\n"
-                if task['Deadline']:
-                    message += f"     📅 {task['Deadline']}\n"
-            message += "\n"
 
-        keyboard = [
-            [InlineKeyboardButton("➕ Добавить задачу", callback_data='select_project_for_task')],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
-        ]
+async def archive_job(context: ContextTypes.DEFAULT_TYPE):
+    """Перенос старых выполненных задач в архив (по расписанию JobQueue)"""
+    before = (datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)).strftime('%Y-%m-%d')
+    moved = await sheets_manager.archive_tasks(before)
+    if moved:
+        logger.info("В архив перенесено задач: %d (созданы до %s)", moved, before)
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
 
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(message, reply_markup=reply_markup)
-        except:
-            await update.callback_query.message.reply_text(message, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(message, reply_markup=reply_markup)
+# Сводка по проектам
+@timed('handler', 'dashboard')
+async def dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /dashboard: прогресс по проектам из счетчиков, без чтения всех задач"""
+    projects = await sheets_manager.get_projects()
+    stats = await sheets_manager.task_stats()
+    text, keyboard = render_dashboard(projects, stats, datetime.now().strftime('%Y-%m-%d'))
+    await send_view(update, split_message(text), InlineKeyboardMarkup(keyboard))
 
 
 # Задачи конкретного проекта
+@timed('handler', 'project_tasks')
 async def project_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Задачи конкретного проекта"""
     query = update.callback_query
     project_id = query.data.split('_')[2]
 
-    # Найдем проект по ID
-    projects = sheets_manager.get_projects()
-    project_name = None
-    for project in projects:
-        if str(project['ID']) == project_id:
-            project_name = project['Name']
-            break
-
-    if not project_name:
-        await query.answer("Проект не найден")
+    async def render():
+        project = await sheets_manager.get_project(project_id)
+        if not project:
+            return None
+        tasks = await sheets_manager.get_tasks(project['Name'])
+        return render_project_tasks(project_id, project['Name'], tasks)
+
+    version = (sheets_manager.data_version(PROJECTS_SHEET), sheets_manager.data_version(TASKS_SHEET))
+    view = await VIEWS.get_or_render(('project_tasks', project_id), version, render)
+    if view is None:
+        await SENDER.answer(query, "Проект не найден")
         return
 
-    tasks = sheets_manager.get_tasks(project_name)
-
-    if not tasks:
-        message = f"📭 Нет задач в проекте '{project_name}'"
-    else:
-        message = f"✅ Задачи проекта '{project_name}':\n\n"
-        for task in tasks:
-            status_icon = "✅" if task['Status'] == 'done' else "⏳" if task['Status'] == 'in_progress' else "📝"
-            priority_icon = "🔴" if task['Priority'] == 'high' else "🟡" if task['Priority'] == 'medium' else "🟢"
-            message += f"{status_icon} {priority_icon} {task['ID']}. {task['Title']}\n"
-            if task['Description']:
-                message += f"   {task['Description']}\n"
-            if task['Deadline']:
-                message += f"   📅 {task['Deadline']}\n"
-            message += "\n"
-
-    keyboard = [
-        [InlineKeyboardButton("➕ Добавить задачу", callback_data=f'add_task_to_project_{project_id}')],
-        [InlineKeyboardButton("📋 Все проекты", callback_data='projects')],
-        [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    try:
-        await query.message.edit_text(message, reply_markup=reply_markup)
-    except:
-        await query.message.reply_text(message, reply_markup=reply_markup)
+    await send_view(update, *view)
 
 
 # Выбор проекта для создания задачи
+@timed('handler', 'select_project_for_task')
 async def select_project_for_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Выбор проекта для создания задачи"""
-    projects = sheets_manager.get_projects()
+    projects = await sheets_manager.get_projects()
 
     if not projects:
         message = "Сначала создайте проект!"
@@ -214,31 +216,21 @@ async def select_project_for_task(update: Update, context: ContextTypes.DEFAULT_
 
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(message, reply_markup=reply_markup)
-        except:
-            await update.callback_query.message.reply_text(message, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(message, reply_markup=reply_markup)
+    await SENDER.show(update, message, reply_markup)
 
 
 # После выбора проекта - ввод задачи
+@timed('handler', 'project_selected_for_task')
 async def project_selected_for_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Проект выбран, теперь вводим задачу"""
     query = update.callback_query
     project_id = query.data.split('_')[2]
 
-    # Найдем проект по ID
-    projects = sheets_manager.get_projects()
-    project_name = None
-    for project in projects:
-        if str(project['ID']) == project_id:
-            project_name = project['Name']
-            break
+    project = await sheets_manager.get_project(project_id)
+    project_name = project['Name'] if project else None
 
     if not project_name:
-        await query.answer("Проект не найден")
+        await SENDER.answer(query, "Проект не найден")
         return
 
     context.user_data['selected_project'] = project_name
@@ -248,98 +240,47 @@ async def project_selected_for_task(update: Update, context: ContextTypes.DEFAUL
     message += "Название задачи\n"
     message += "Описание задачи (опционально)\n"
     message += "Приоритет (high/medium/low, опционально)\n"
-    message += "Дедлайн (опционально, формат: YYYY-MM-DD)"
+    message += "Дедлайн (опционально, формат: YYYY-MM-DD)\n\n"
+    message += "Чтобы добавить сразу несколько задач, разделите их пустой строкой "
+    message += "или отправьте CSV-файл (колонки: Title, Description, Priority, Deadline, Project)"
 
     keyboard = [
         [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    try:
-        await query.message.edit_text(message, reply_markup=reply_markup)
-    except:
-        await query.message.reply_text(message, reply_markup=reply_markup)
+    await SENDER.edit(query.message, message, reply_markup)
     context.user_data['waiting_for'] = 'task_info'
 
 
 # Заметки
-async def notes_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Список заметок"""
-    notes = sheets_manager.get_notes()
+@timed('handler', 'notes_list')
+async def notes_list(update: Update, context: ContextTypes.DEFAULT_TYPE, page=0):
+    """Список заметок (постранично)"""
+    async def render():
+        notes, total = await sheets_manager.get_notes_page(page * PAGE_SIZE, PAGE_SIZE)
+        return render_notes(notes, page, total)
 
-    if not notes:
-        message = "📭 Нет заметок. Создайте первую!"
-        keyboard = [
-            [InlineKeyboardButton("➕ Добавить заметку", callback_data='add_note')],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
-        ]
-    else:
-        message = "📝 Ваши заметки:\n\n"
-        for note in notes[:10]:
-            message += f"📌 {note['ID']}. {note['Title']}\n"
-            if note['Tags']:
-                message += f"   🏷️ {note['Tags']}\n"
-            message += f"   {note['Content'][:100]}{'...' if len(note['Content']) > 100 else ''}\n"
-            message += f"   📅 {note['Created']}\n\n"
-
-        if len(notes) > 10:
-            message += f"... и еще {len(notes) - 10} заметок\n\n"
-
-        keyboard = [
-            [InlineKeyboardButton("➕ Добавить заметку", callback_data='add_note')],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
-        ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(message, reply_markup=reply_markup)
-        except:
-            await update.callback_query.message.reply_text(message, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(message, reply_markup=reply_markup)
+    chunks, reply_markup = await VIEWS.get_or_render(
+        ('notes', page), sheets_manager.data_version(NOTES_SHEET), render)
+    await send_view(update, chunks, reply_markup)
 
 
 # Секреты
-async def secrets_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Список секретов"""
-    secrets = sheets_manager.get_secrets()
+@timed('handler', 'secrets_list')
+async def secrets_list(update: Update, context: ContextTypes.DEFAULT_TYPE, page=0):
+    """Список секретов (постранично)"""
+    async def render():
+        secrets, total = await sheets_manager.get_secrets_page(page * PAGE_SIZE, PAGE_SIZE)
+        return render_secrets(secrets, page, total)
 
-    if not secrets:
-        message = "📭 Нет секретов. Добавьте первый!"
-        keyboard = [
-            [InlineKeyboardButton("➕ Добавить секрет", callback_data='add_secret')],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
-        ]
-    else:
-        message = "🔐 Ваши секреты:\n\n"
-        for secret in secrets[:5]:
-            message += f"🔒 {secret['ID']}. {secret['Name']}\n"
-            if secret['Description']:
-                message += f"   {secret['Description']}\n"
-            message += f"   📅 {secret['Created']}\n\n"
-
-        if len(secrets) > 5:
-            message += f"... и еще {len(secrets) - 5} секретов\n\n"
-
-        keyboard = [
-            [InlineKeyboardButton("➕ Добавить секрет", callback_data='add_secret')],
-            [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
-        ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(message, reply_markup=reply_markup)
-        except:
-            await update.callback_query.message.reply_text(message, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(message, reply_markup=reply_markup)
+    chunks, reply_markup = await VIEWS.get_or_render(
+        ('secrets', page), sheets_manager.data_version(SECRETS_SHEET), render)
+    await send_view(update, chunks, reply_markup)
 
 
 # Создание проекта
+@timed('handler', 'create_project_start')
 async def create_project_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало создания проекта"""
     message = "Введите название проекта и описание (через новую строку):\n"
@@ -352,18 +293,13 @@ async def create_project_start(update: Update, context: ContextTypes.DEFAULT_TYP
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(message, reply_markup=reply_markup)
-        except:
-            await update.callback_query.message.reply_text(message, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(message, reply_markup=reply_markup)
+    await SENDER.show(update, message, reply_markup)
 
     context.user_data['waiting_for'] = 'project_info'
 
 
 # Добавление заметки
+@timed('handler', 'add_note_start')
 async def add_note_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало добавления заметки"""
     message = "Введите заметку в формате:\n"
@@ -377,18 +313,13 @@ async def add_note_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(message, reply_markup=reply_markup)
-        except:
-            await update.callback_query.message.reply_text(message, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(message, reply_markup=reply_markup)
+    await SENDER.show(update, message, reply_markup)
 
     context.user_data['waiting_for'] = 'note_info'
 
 
 # Добавление секрета
+@timed('handler', 'add_secret_start')
 async def add_secret_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало добавления секрета"""
     message = "Введите секрет в формате:\n"
@@ -401,18 +332,75 @@ async def add_secret_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    if update.callback_query:
-        try:
-            await update.callback_query.message.edit_text(message, reply_markup=reply_markup)
-        except:
-            await update.callback_query.message.reply_text(message, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(message, reply_markup=reply_markup)
+    await SENDER.show(update, message, reply_markup)
 
     context.user_data['waiting_for'] = 'secret_info'
 
 
+# Импорт задач
+@timed('handler', 'import_start')
+async def import_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /import: пакетное добавление задач"""
+    context.user_data.pop('selected_project', None)
+    context.user_data['waiting_for'] = 'task_info'
+
+    message = "Импорт задач\n\n"
+    message += "Отправьте задачи текстом — каждую блоком строк, блоки через пустую строку:\n"
+    message += "Название задачи\n"
+    message += "Описание (опционально)\n"
+    message += "Приоритет (high/medium/low, опционально)\n"
+    message += "Дедлайн (опционально, формат: YYYY-MM-DD)\n\n"
+    message += "Или CSV-файл с колонками Title, Description, Priority, Deadline, Project"
+    await SENDER.reply(update.message, message)
+
+
+async def import_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE, tasks, truncated):
+    """Записать разобранные задачи одним пакетом и вернуться в меню"""
+    if not tasks:
+        await SENDER.reply(update.message, "Не найдено ни одной задачи")
+        return
+
+    task_ids = [task_id for task_id in await sheets_manager.add_tasks(tasks) if task_id]
+    if task_ids:
+        message = f"✅ Импортировано задач: {len(task_ids)} (ID {task_ids[0]}–{task_ids[-1]})"
+        if truncated:
+            message += f"\n⚠️ Добавлены только первые {IMPORT_MAX_TASKS}"
+        await SENDER.reply(update.message, message)
+    else:
+        await SENDER.reply(update.message, "❌ Ошибка импорта задач")
+
+    context.user_data.pop('waiting_for', None)
+    context.user_data.pop('selected_project', None)
+    await show_main_menu(update, context)
+
+
+@timed('handler', 'handle_document')
+async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """CSV-файл с задачами"""
+    if context.user_data.get('waiting_for') != 'task_info':
+        return
+
+    document = update.message.document
+    if not is_csv(document.file_name, document.mime_type):
+        await SENDER.reply(update.message, "Нужен CSV-файл (.csv). Таблицу Excel сохраните как «CSV UTF-8»")
+        return
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await SENDER.reply(update.message, f"Файл слишком большой (максимум {IMPORT_MAX_BYTES // 1024} КБ)")
+        return
+
+    file = await document.get_file()
+    data = await file.download_as_bytearray()
+    project = context.user_data.get('selected_project', 'Без проекта')
+    try:
+        tasks, truncated = collect(parse_csv(io.BytesIO(data), project))
+    except CSVFormatError:
+        await SENDER.reply(update.message, "❌ Файл не похож на CSV в кодировке UTF-8 — задачи не импортированы")
+        return
+    await import_tasks(update, context, tasks, truncated)
+
+
 # Обработка текстовых сообщений
+@timed('handler', 'handle_message')
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка текстовых сообщений"""
     if 'waiting_for' not in context.user_data:
@@ -425,11 +413,11 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         name = lines[0]
         description = lines[1] if len(lines) > 1 else ""
 
-        project_id = sheets_manager.add_project(name, description)
+        project_id = await sheets_manager.add_project(name, description)
         if project_id:
-            await update.message.reply_text(f"✅ Проект '{name}' создан! ID: {project_id}")
+            await SENDER.reply(update.message, f"✅ Проект '{name}' создан! ID: {project_id}")
         else:
-            await update.message.reply_text("❌ Ошибка создания проекта")
+            await SENDER.reply(update.message, "❌ Ошибка создания проекта")
 
         context.user_data.pop('waiting_for', None)
         # Показать главное меню
@@ -438,10 +426,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif context.user_data['waiting_for'] == 'task_info':
         lines = text.split('\n')
         if len(lines) < 1:
-            await update.message.reply_text("Неверный формат! Нужно минимум 1 строка")
+            await SENDER.reply(update.message, "Неверный формат! Нужно минимум 1 строка")
             return
 
         project = context.user_data.get('selected_project', 'Без проекта')
+        if re.search(r'\n\s*\n', text.strip()):
+            # Несколько задач через пустую строку — одна пакетная запись
+            await import_tasks(update, context, *collect(parse_blocks(text, project)))
+            return
+
         title = lines[0]
         description = lines[1] if len(lines) > 1 else ""
         priority = lines[2] if len(lines) > 2 else "medium"
@@ -451,11 +444,11 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if priority not in ['high', 'medium', 'low']:
             priority = 'medium'
 
-        task_id = sheets_manager.add_task(project, title, description, priority, deadline)
+        task_id = await sheets_manager.add_task(project, title, description, priority, deadline)
         if task_id:
-            await update.message.reply_text(f"✅ Задача '{title}' создана! ID: {task_id}")
+            await SENDER.reply(update.message, f"✅ Задача '{title}' создана! ID: {task_id}")
         else:
-            await update.message.reply_text("❌ Ошибка создания задачи")
+            await SENDER.reply(update.message, "❌ Ошибка создания задачи")
 
         context.user_data.pop('waiting_for', None)
         context.user_data.pop('selected_project', None)
@@ -465,7 +458,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif context.user_data['waiting_for'] == 'note_info':
         lines = text.split('\n')
         if len(lines) < 2:
-            await update.message.reply_text("Неверный формат! Нужно минимум 2 строки")
+            await SENDER.reply(update.message, "Неверный формат! Нужно минимум 2 строки")
             return
 
         title = lines[0]
@@ -473,11 +466,11 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         tags = lines[2] if len(lines) > 2 else ""
         project = lines[3] if len(lines) > 3 else ""
 
-        note_id = sheets_manager.add_note(title, content, tags, project)
+        note_id = await sheets_manager.add_note(title, content, tags, project)
         if note_id:
-            await update.message.reply_text(f"✅ Заметка '{title}' создана! ID: {note_id}")
+            await SENDER.reply(update.message, f"✅ Заметка '{title}' создана! ID: {note_id}")
         else:
-            await update.message.reply_text("❌ Ошибка создания заметки")
+            await SENDER.reply(update.message, "❌ Ошибка создания заметки")
 
         context.user_data.pop('waiting_for', None)
         # Показать главное меню
@@ -486,18 +479,18 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif context.user_data['waiting_for'] == 'secret_info':
         lines = text.split('\n')
         if len(lines) < 2:
-            await update.message.reply_text("Неверный формат! Нужно минимум 2 строки")
+            await SENDER.reply(update.message, "Неверный формат! Нужно минимум 2 строки")
             return
 
         name = lines[0]
         description = lines[1]
         data = lines[2] if len(lines) > 2 else ""
 
-        secret_id = sheets_manager.add_secret(name, description, data)
+        secret_id = await sheets_manager.add_secret(name, description, data)
         if secret_id:
-            await update.message.reply_text(f"✅ Секрет '{name}' сохранен! ID: {secret_id}")
+            await SENDER.reply(update.message, f"✅ Секрет '{name}' сохранен! ID: {secret_id}")
         else:
-            await update.message.reply_text("❌ Ошибка сохранения секрета")
+            await SENDER.reply(update.message, "❌ Ошибка сохранения секрета")
 
         context.user_data.pop('waiting_for', None)
         # Показать главное меню
@@ -505,10 +498,26 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 # Обработчик кнопок
+@timed('handler', 'button_handler')
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка кнопок"""
     query = update.callback_query
-    await query.answer()
+    try:
+        with METRICS.timer('button', _button_branch(query.data)):
+            await _dispatch_button(update, context)
+    finally:
+        # Один ответ на запрос: обработчик мог уже ответить с текстом
+        await SENDER.answer(query)
+
+
+def _button_branch(data):
+    """Название ветки обработчика кнопок без ID в конце: project_tasks_5 -> project_tasks"""
+    return re.sub(r'_\d+$', '', data or '')
+
+
+async def _dispatch_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Выбор действия по callback_data"""
+    query = update.callback_query
 
     if query.data == 'main_menu':
         await show_main_menu(update, context)
@@ -525,6 +534,21 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif query.data == 'secrets':
         await secrets_list(update, context)
 
+    elif query.data == 'dashboard':
+        await dashboard(update, context)
+
+    elif query.data.startswith('projects_page_'):
+        await projects_list(update, context, page=int(query.data.split('_')[2]))
+
+    elif query.data.startswith('tasks_page_'):
+        await tasks_list(update, context, page=int(query.data.split('_')[2]))
+
+    elif query.data.startswith('notes_page_'):
+        await notes_list(update, context, page=int(query.data.split('_')[2]))
+
+    elif query.data.startswith('secrets_page_'):
+        await secrets_list(update, context, page=int(query.data.split('_')[2]))
+
     elif query.data == 'create_project':
         await create_project_start(update, context)
 
@@ -537,6 +561,9 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif query.data.startswith('project_tasks_'):
         await project_tasks(update, context)
 
+    elif query.data.startswith('project_archive_'):
+        await project_archive(update, context)
+
     elif query.data.startswith('add_task_to_project_'):
         project_id = query.data.split('_')[4]
         # Переход к выбору проекта для задачи
@@ -549,21 +576,160 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await add_secret_start(update, context)
 
 
+# Поиск по заметкам и задачам
+@timed('handler', 'search')
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /search <запрос>"""
+    query = " ".join(context.args or [])
+    if not query.strip():
+        await SENDER.reply(update.message, "Использование: /search <слова для поиска>")
+        return
+
+    results = await sheets_manager.search(query)
+    for chunk in split_message(render_search(query, results)):
+        await SENDER.reply(update.message, chunk)
+
+
+# Inline-режим: @бот <начало названия проекта или задачи>
+@timed('handler', 'inline_query')
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Проекты и задачи по префиксам слов запроса (inline-режим включается в @BotFather)"""
+    query = update.inline_query.query.strip()
+    if not query:
+        return
+
+    key = query.lower()
+    version = (sheets_manager.data_version(PROJECTS_SHEET), sheets_manager.data_version(TASKS_SHEET))
+    cached = INLINE_VIEWS.get(key, version)
+    if cached is not None:
+        METRICS.inc('view_cache', 'hit')
+        articles = cached[0]
+    else:
+        METRICS.inc('view_cache', 'miss')
+        results = await sheets_manager.search(query, INLINE_RESULTS, sheets=(PROJECTS_SHEET, TASKS_SHEET))
+        articles = render_inline(results)
+        INLINE_VIEWS.set(key, version, articles, None)
+
+    try:
+        await update.inline_query.answer(articles, cache_time=INLINE_CACHE_TIME)
+    except BadRequest:
+        # Запрос устарел: пользователь уже набрал следующий
+        pass
+
+
+# Массовое изменение статуса задач
+@timed('handler', 'done')
+async def done_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /done <ID> [<ID> ...]: отметить задачи выполненными одним запросом"""
+    task_ids = [int(part) for part in re.findall(r'\d+', " ".join(context.args or []))]
+    if not task_ids:
+        await SENDER.reply(update.message, "Использование: /done <ID задачи> [<ID> ...], например /done 3 5 7")
+        return
+
+    updated = await sheets_manager.update_tasks_status(task_ids, 'done')
+    missing = [task_id for task_id in dict.fromkeys(task_ids) if task_id not in updated]
+    lines = []
+    if updated:
+        lines.append("✅ Выполнены задачи: " + ", ".join(map(str, updated)))
+    if missing:
+        lines.append("❌ Не найдены: " + ", ".join(map(str, missing)))
+    await SENDER.reply(update.message, "\n".join(lines))
+
+
+# Статистика для администраторов
+@timed('handler', 'stats')
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /stats: задержки обработчиков и хранилища, запросы к Google Sheets"""
+    if update.effective_user is None or update.effective_user.id not in ADMIN_IDS:
+        await SENDER.reply(update.message, "⛔ Команда доступна только администраторам")
+        return
+
+    lines = ["📊 Статистика", ""]
+    for title, name in [("Обработчики", 'handler'), ("Кнопки", 'button'), ("Хранилище", 'storage_call'),
+                        ("Google Sheets API", 'sheets_api')]:
+        rows = METRICS.summary(name)
+        if not rows:
+            continue
+        lines.append(f"{title}:")
+        for label, count, errors, avg_ms, p95 in rows[:10]:
+            lines.append(f"  {label}: {count} выз., ср. {avg_ms:.0f} мс, p95 ≤ {p95:g} мс, ошибок {errors}")
+        lines.append("")
+
+    errors = METRICS.counter_values('storage_errors_total')
+    if errors:
+        lines.append("Ошибки хранилища: " + ", ".join(f"{k}={v}" for k, v in sorted(errors.items())))
+    calls = METRICS.counter_values('sheets_api_calls_total')
+    if calls:
+        lines.append(f"Запросов к Google Sheets: {sum(calls.values())}")
+    cache = sheets_manager.cache_stats()
+    if cache:
+        lines.append("Кэш: " + ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                         for k, v in cache.items()))
+
+    await SENDER.reply(update.message, "\n".join(lines))
+
+
+async def connect_sheets(application: Application):
+    """Фоновое подключение хранилища, шифрование секретов, загрузка напоминаний и запуск архивации"""
+    try:
+        await sheets_manager.connect()
+        logger.info("Хранилище подключено через %.2f с после запуска", time.monotonic() - STARTED_AT)
+    except Exception as e:
+        # Следующее обращение к хранилищу попробует подключиться снова
+        logger.error("Ошибка подключения хранилища: %s", e)
+    # Ключ выводится один раз вне event loop; секреты, сохраненные до включения шифрования, шифруются
+    await asyncio.get_running_loop().run_in_executor(None, warm_up_secrets)
+    encrypted = await sheets_manager.encrypt_secrets()
+    if encrypted:
+        logger.info("Зашифровано секретов: %d", encrypted)
+    await reminders.start(application, sheets_manager)
+    if application.job_queue is not None and ARCHIVE_INTERVAL > 0:
+        application.job_queue.run_repeating(archive_job, interval=ARCHIVE_INTERVAL * 3600, first=60,
+                                            name='archive_tasks')
+
+
+async def on_startup(application: Application):
+    """Бот готов принимать обновления; хранилище подключается в фоне"""
+    application.bot_data['sheets_connect'] = asyncio.create_task(connect_sheets(application))
+    if METRICS_PORT:
+        application.bot_data['metrics_server'] = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        logger.info("Метрики доступны на http://%s:%d/metrics", METRICS_HOST, METRICS_PORT)
+    logger.info("Бот готов через %.2f с после запуска", time.monotonic() - STARTED_AT)
+
+
+async def on_shutdown(application: Application):
+    """Сброс отложенных записей и остановка пула потоков хранилища"""
+    server = application.bot_data.get('metrics_server')
+    if server:
+        server.close()
+    sheets_manager.shutdown()
+
+
 def main():
     """Запуск бота"""
     print("🚀 Запуск TaskBot...")
 
-    # Создание приложения
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Создание приложения: обновления разных чатов обрабатываются параллельно
+    application = Application.builder().token(BOT_TOKEN) \
+        .concurrent_updates(ChatOrderedUpdateProcessor()) \
+        .post_init(on_startup).post_shutdown(on_shutdown).build()
 
     # Регистрация обработчиков
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("projects", projects_list))
     application.add_handler(CommandHandler("tasks", tasks_list))
     application.add_handler(CommandHandler("notes", notes_list))
+    application.add_handler(CommandHandler("search", search_command))
+    application.add_handler(CommandHandler("dashboard", dashboard))
+    application.add_handler(CommandHandler("import", import_start))
+    application.add_handler(CommandHandler("done", done_command))
+    application.add_handler(CommandHandler("archive", archive_command))
+    application.add_handler(CommandHandler("stats", stats_command))
 
     application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(InlineQueryHandler(inline_query))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(MessageHandler(filters.Document.ALL, handle_document))
 
     print("✅ Бот запущен! Нажмите Ctrl+C для остановки")
 
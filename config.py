@@ -14,4 +14,88 @@ CREDENTIALS_FILE = 'credentials.json'
 PROJECTS_SHEET = 'Projects'
 TASKS_SHEET = 'Tasks'
 NOTES_SHEET = 'Notes'
-SECRETS_SHEET = 'Secrets'
\ No newline at end of file
+SECRETS_SHEET = 'Secrets'
+ARCHIVE_SHEET = 'TasksArchive'  # Выполненные задачи, перенесенные из Tasks
+META_SHEET = '_Meta'  # Скрытый лист со служебными данными (счетчики ID)
+
+# Пул потоков для запросов к Google Sheets
+SHEETS_MAX_WORKERS = int(os.getenv('SHEETS_MAX_WORKERS', 4))
+SHEETS_MAX_QUEUE = int(os.getenv('SHEETS_MAX_QUEUE', 32))
+
+# Кэш записей листов
+CACHE_TTL = int(os.getenv('CACHE_TTL', 60))  # секунд
+CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', 50000))  # записей во всех листах
+
+# Отложенная пакетная запись в Google Sheets
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', '0') == '1'
+WRITE_FLUSH_INTERVAL = float(os.getenv('WRITE_FLUSH_INTERVAL', 2))  # секунд
+WRITE_FLUSH_SIZE = int(os.getenv('WRITE_FLUSH_SIZE', 50))  # изменений
+
+# Хранилище: 'sqlite' (основное, Google Sheets — зеркало) или 'sheets' (только Google Sheets)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'tracker.db')
+SHEETS_MIRROR = os.getenv('SHEETS_MIRROR', '1') == '1'
+MIRROR_RETRY_DELAY = float(os.getenv('MIRROR_RETRY_DELAY', 5))  # секунд
+# Сколько при остановке бота дописывать очередь зеркала в Google Sheets (Render ждет ~30 с после SIGTERM)
+MIRROR_DRAIN_TIMEOUT = float(os.getenv('MIRROR_DRAIN_TIMEOUT', 20))  # секунд
+
+# Администраторы бота (Telegram user id через запятую) — доступ к /stats
+ADMIN_IDS = {int(x) for x in os.getenv('ADMIN_IDS', '').split(',') if x.strip().isdigit()}
+
+# HTTP-эндпоинт с метриками (GET /metrics); 0 — не запускать
+METRICS_HOST = os.getenv('METRICS_HOST', '0.0.0.0')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9100))
+
+# Квоты Google Sheets API (запросов в минуту) и повторы при 429/5xx
+SHEETS_READS_PER_MIN = int(os.getenv('SHEETS_READS_PER_MIN', 60))
+SHEETS_WRITES_PER_MIN = int(os.getenv('SHEETS_WRITES_PER_MIN', 60))
+SHEETS_BURST = int(os.getenv('SHEETS_BURST', 10))
+SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', 5))
+SHEETS_BACKOFF_BASE = float(os.getenv('SHEETS_BACKOFF_BASE', 1))  # секунд
+SHEETS_BACKOFF_MAX = float(os.getenv('SHEETS_BACKOFF_MAX', 32))  # секунд
+
+# Записей на странице в списках бота
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', 10))
+
+# Параллельная обработка обновлений Telegram (обновления одного чата — по очереди)
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', 16))
+MAX_PENDING_UPDATES = int(os.getenv('MAX_PENDING_UPDATES', 256))
+
+# Кэш отрисованных экранов бота (экранов)
+VIEW_CACHE_SIZE = int(os.getenv('VIEW_CACHE_SIZE', 1000))
+
+# Ограничения Telegram на отправку: всего, в личный чат и в группу
+TELEGRAM_GLOBAL_PER_SEC = float(os.getenv('TELEGRAM_GLOBAL_PER_SEC', 30))
+TELEGRAM_CHAT_PER_SEC = float(os.getenv('TELEGRAM_CHAT_PER_SEC', 1))
+TELEGRAM_CHAT_BURST = int(os.getenv('TELEGRAM_CHAT_BURST', 3))
+TELEGRAM_GROUP_PER_MIN = float(os.getenv('TELEGRAM_GROUP_PER_MIN', 20))
+
+# Перед повторным чтением листа проверять время изменения таблицы (Drive API)
+CHANGE_PROBE = os.getenv('CHANGE_PROBE', '1') == '1'
+
+# Напоминания о дедлайнах: куда слать (ID чатов через запятую, по умолчанию — администраторам),
+# в котором часу и за сколько дней до дедлайна
+REMINDER_CHAT_IDS = [int(x) for x in os.getenv('REMINDER_CHAT_IDS', '').split(',') if x.strip().lstrip('-').isdigit()] \
+    or sorted(ADMIN_IDS)
+REMINDER_HOUR = int(os.getenv('REMINDER_HOUR', 9))
+REMINDER_DAYS_BEFORE = [int(x) for x in os.getenv('REMINDER_DAYS_BEFORE', '1,0').split(',') if x.strip().isdigit()]
+# Через сколько секунд повторить чтение задач, если при старте лист прочитать не удалось
+REMINDER_RETRY_DELAY = float(os.getenv('REMINDER_RETRY_DELAY', 60))
+
+# Пакетный импорт задач (текст или CSV)
+IMPORT_MAX_TASKS = int(os.getenv('IMPORT_MAX_TASKS', 1000))
+IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', 2 * 1024 * 1024))
+
+# Архив: выполненные задачи старше ARCHIVE_AFTER_DAYS дней (по дате создания)
+# переносятся из Tasks в TasksArchive раз в ARCHIVE_INTERVAL часов (0 — не переносить)
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 30))
+ARCHIVE_INTERVAL = float(os.getenv('ARCHIVE_INTERVAL', 6))  # часов
+
+# Шифрование колонки Data листа Secrets: мастер-пароль и соль для вывода ключа (scrypt).
+# Без SECRETS_KEY секреты хранятся как есть; при запуске с ключом старые записи шифруются
+SECRETS_KEY = os.getenv('SECRETS_KEY', '')
+SECRETS_KEY_SALT = os.getenv('SECRETS_KEY_SALT', 'taskbot-secrets')
+
+# Inline-режим (@бот запрос): сколько результатов отдавать и сколько секунд их кэшировать
+INLINE_RESULTS = int(os.getenv('INLINE_RESULTS', 20))  # не больше 50
+INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', 30))  # секунд
@@ -0,0 +1,252 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+
+class ApiStats:
+    """Счетчики запросов к поддельной таблице"""
+
+    def __init__(self, latency=0.0, sleep=False):
+        self.latency = latency  # Задержка одного запроса, секунд
+        self.sleep = sleep  # Реально ждать latency или только учитывать
+        self.calls = 0
+        self.bytes = 0
+        self.simulated = 0.0
+        self.by_method = {}
+        self._lock = threading.Lock()
+
+    def record(self, method, payload=None):
+        size = len(json.dumps(payload, default=str, ensure_ascii=False)) if payload is not None else 0
+        with self._lock:
+            self.calls += 1
+            self.bytes += size
+            self.simulated += self.latency
+            self.by_method[method] = self.by_method.get(method, 0) + 1
+        if self.sleep and self.latency:
+            time.sleep(self.latency)
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.bytes = 0
+            self.simulated = 0.0
+            self.by_method = {}
+
+
+def _numericise(value):
+    if isinstance(value, str) and re.fullmatch(r'-?\d+', value):
+        return int(value)
+    return value
+
+
+class FakeWorksheet:
+    """Лист в памяти с методами gspread.Worksheet, которые использует бот"""
+
+    def __init__(self, spreadsheet, title, sheet_id, rows=1000, cols=26):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.row_count = rows
+        self.col_count = cols
+        self.hidden = False
+        self.data = []  # строки таблицы, включая заголовок
+
+    def _record(self, method, payload=None):
+        self.spreadsheet.stats.record(method, payload)
+
+    def _set(self, row, col, value):
+        self.spreadsheet.touch()
+        while len(self.data) < row:
+            self.data.append([])
+        line = self.data[row - 1]
+        while len(line) < col:
+            line.append('')
+        line[col - 1] = value
+
+    def get_all_values(self):
+        values = [list(row) for row in self.data]
+        self._record('get_all_values', values)
+        return values
+
+    def get_all_records(self, numericise_ignore=None):
+        values = [list(row) for row in self.data]
+        self._record('get_all_records', values)
+        if not values:
+            return []
+        headers = values[0]
+        ignore = numericise_ignore or []
+        raw = set(range(len(headers))) if 'all' in ignore else {col - 1 for col in ignore}
+        return [
+            {h: (row[i] if i in raw else _numericise(row[i])) if i < len(row) else '' for i, h in enumerate(headers)}
+            for row in values[1:]
+        ]
+
+    def col_values(self, col):
+        values = [row[col - 1] if len(row) >= col else '' for row in self.data]
+        while values and values[-1] == '':
+            values.pop()
+        self._record('col_values', values)
+        return values
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self._record('append_rows', values)
+        self.spreadsheet.touch()
+        first = len(self.data) + 1
+        for row in values:
+            self.data.append(list(row))
+        last = len(self.data)
+        width = max([len(row) for row in values] + [1])
+        return {'updates': {'updatedRange': f"{self.title}!A{first}:{rowcol_to_a1(last, width)}"}}
+
+    def update_cell(self, row, col, value):
+        self._record('update_cell', value)
+        self._set(row, col, value)
+
+    def update(self, range_name, values=None, **kwargs):
+        self._record('update', values)
+        start_row, start_col = a1_to_rowcol(range_name.split(':')[0])
+        for r, line in enumerate(values or []):
+            for c, value in enumerate(line):
+                self._set(start_row + r, start_col + c, value)
+
+    def batch_update(self, data, **kwargs):
+        self._record('batch_update', data)
+        for item in data:
+            start_row, start_col = a1_to_rowcol(item['range'].split('!')[-1].split(':')[0])
+            for r, line in enumerate(item['values']):
+                for c, value in enumerate(line):
+                    self._set(start_row + r, start_col + c, value)
+
+    def delete_rows(self, start_index, end_index=None):
+        self._record('delete_rows')
+        end_index = end_index or start_index
+        self.spreadsheet.touch()
+        del self.data[start_index - 1:end_index]
+
+    def hide(self):
+        self._record('hide')
+        self.hidden = True
+
+
+class FakeSpreadsheet:
+    """Таблица в памяти с методами gspread.Spreadsheet, которые использует бот.
+
+    Каждый метод, который в gspread делает HTTP-запрос, учитывается в stats:
+    число запросов, объем данных и имитируемая задержка.
+    """
+
+    def __init__(self, latency=0.0, sleep=False):
+        self.stats = ApiStats(latency, sleep)
+        self._worksheets = []
+        self._next_id = 1
+        self.version = 0  # растет при любом изменении, как Drive modifiedTime
+
+    def seed(self, title, rows):
+        """Заполнить лист без учета запросов (подготовка данных)"""
+        try:
+            ws = self._find(title)
+        except WorksheetNotFound:
+            ws = self._add(title, len(rows[0]) if rows else 26)
+        ws.data = [list(row) for row in rows]
+        self.touch()
+        return ws
+
+    def touch(self):
+        self.version += 1
+
+    def edit(self, title, row, col, value):
+        """Изменить ячейку «вручную», как человек в интерфейсе Google Sheets"""
+        self._find(title)._set(row, col, value)
+
+    def get_lastUpdateTime(self):
+        modified = datetime(2024, 1, 1) + timedelta(milliseconds=self.version)
+        stamp = modified.strftime('%Y-%m-%dT%H:%M:%S.') + f'{modified.microsecond // 1000:03d}Z'
+        self.stats.record('get_lastUpdateTime', {'modifiedTime': stamp})
+        return stamp
+
+    def _find(self, title):
+        for ws in self._worksheets:
+            if ws.title == title:
+                return ws
+        raise WorksheetNotFound(title)
+
+    def _add(self, title, cols, rows=1000, sheet_id=None):
+        sheet_id = sheet_id if sheet_id is not None else self._next_id
+        self._next_id = max(self._next_id, sheet_id) + 1
+        ws = FakeWorksheet(self, title, sheet_id, rows, cols)
+        self._worksheets.append(ws)
+        self.touch()
+        return ws
+
+    def worksheets(self, exclude_hidden=False):
+        self.stats.record('worksheets')
+        return [ws for ws in self._worksheets if not (exclude_hidden and ws.hidden)]
+
+    def worksheet(self, title):
+        self.stats.record('worksheet')
+        return self._find(title)
+
+    def add_worksheet(self, title, rows, cols):
+        self.stats.record('add_worksheet')
+        return self._add(title, cols, rows)
+
+    def batch_update(self, body):
+        self.stats.record('batch_update', body)
+        replies = []
+        by_id = {ws.id: ws for ws in self._worksheets}
+        for request in body.get('requests', []):
+            if 'addSheet' in request:
+                properties = request['addSheet']['properties']
+                grid = properties.get('gridProperties', {})
+                ws = self._add(properties['title'], grid.get('columnCount', 26),
+                               grid.get('rowCount', 1000), properties.get('sheetId'))
+                ws.hidden = properties.get('hidden', False)
+                by_id[ws.id] = ws
+                replies.append({'addSheet': {'properties': dict(properties, sheetId=ws.id)}})
+            elif 'updateCells' in request:
+                update = request['updateCells']
+                ws = by_id[update['start']['sheetId']]
+                row0 = update['start'].get('rowIndex', 0)
+                col0 = update['start'].get('columnIndex', 0)
+                for r, line in enumerate(update['rows']):
+                    for c, cell in enumerate(line['values']):
+                        value = next(iter(cell.get('userEnteredValue', {'stringValue': ''}).values()))
+                        ws._set(row0 + r + 1, col0 + c + 1, value)
+                replies.append({})
+            elif 'deleteDimension' in request:
+                span = request['deleteDimension']['range']
+                ws = by_id[span['sheetId']]
+                del ws.data[span['startIndex']:span['endIndex']]
+                self.touch()
+                replies.append({})
+            else:
+                replies.append({})
+        return {'replies': replies}
+
+    def values_batch_get(self, ranges, params=None):
+        columns = (params or {}).get('majorDimension') == 'COLUMNS'
+        value_ranges = []
+        for range_name in ranges:
+            title, _, cells = range_name.rpartition('!')
+            ws = self._find(title.strip("'"))
+            start, _, end = cells.partition(':')
+            start_row, start_col = a1_to_rowcol(start)
+            end_letters, end_digits = re.fullmatch(r'([A-Z]*)(\d*)', end or start).groups()
+            end_col = a1_to_rowcol(end_letters + '1')[1] if end_letters else start_col
+            end_row = int(end_digits) if end_digits else len(ws.data)
+            rows = [
+                [row[c - 1] if len(row) >= c else '' for c in range(start_col, end_col + 1)]
+                for row in ws.data[start_row - 1:end_row]
+            ]
+            values = [list(col) for col in zip(*rows)] if columns else rows
+            value_ranges.append({'range': range_name, 'values': values})
+        response = {'valueRanges': value_ranges}
+        self.stats.record('values_batch_get', response)
+        return response
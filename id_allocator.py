@@ -0,0 +1,57 @@
+import threading
+
+
+class IdAllocator:
+    """Монотонные ID записей для каждого листа.
+
+    Счетчики засеваются один раз при старте (максимальный ID в колонке ID
+    и последнее значение из скрытого листа _Meta) и дальше живут в памяти,
+    так что вставка записи не требует чтения листа. В _Meta счетчик
+    сохраняется при удалении строк — только тогда максимум в колонке ID
+    может уменьшиться и привести к повторной выдаче ID.
+    """
+
+    def __init__(self, meta_values=()):
+        self._last = {}  # лист -> последний выданный ID
+        self._meta_rows = {}  # лист -> номер строки в _Meta
+        self._lock = threading.Lock()
+        for i, row in enumerate(meta_values, start=2):
+            if not row or not row[0]:
+                continue
+            self._meta_rows[row[0]] = i
+            if len(row) >= 2 and str(row[1]).strip().isdigit():
+                self._last[row[0]] = int(row[1])
+
+    def seed(self, sheet_name, ids):
+        """Засеять счетчик по значениям колонки ID листа"""
+        ids = [int(v) for v in ids if str(v).strip().isdigit()]
+        with self._lock:
+            self._last[sheet_name] = max(ids + [self._last.get(sheet_name, 0)])
+
+    def last_id(self, sheet_name):
+        """Последний выданный ID листа"""
+        with self._lock:
+            return self._last.get(sheet_name, 0)
+
+    def next_id(self, sheet_name):
+        """Выдать следующий ID (без обращения к Google Sheets)"""
+        with self._lock:
+            self._last[sheet_name] = self._last.get(sheet_name, 0) + 1
+            return self._last[sheet_name]
+
+    def next_ids(self, sheet_name, count):
+        """Выдать count идущих подряд ID; вернуть первый"""
+        with self._lock:
+            first = self._last.get(sheet_name, 0) + 1
+            self._last[sheet_name] = first + count - 1
+            return first
+
+    def persist(self, sheet_name):
+        """Диапазон и значения для сохранения счетчика листа в _Meta"""
+        with self._lock:
+            value = self._last.get(sheet_name, 0)
+            row = self._meta_rows.get(sheet_name)
+            if row is None:
+                row = len(self._meta_rows) + 2
+                self._meta_rows[sheet_name] = row
+        return f'A{row}:B{row}', [[sheet_name, value]]
@@ -0,0 +1,166 @@
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Границы корзин гистограммы задержек, мс
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+
+class Histogram:
+    """Гистограмма задержек с фиксированными корзинами"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms, error=False):
+        self.count += 1
+        self.total_ms += ms
+        if error:
+            self.errors += 1
+        for i, bound in enumerate(BUCKETS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """Оценка квантиля по верхней границе корзины"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return BUCKETS[-1]
+
+
+class Metrics:
+    """Счетчики и гистограммы задержек в памяти процесса"""
+
+    def __init__(self):
+        self.counters = {}  # (имя, метка) -> значение
+        self.histograms = {}  # (имя, метка) -> Histogram
+        self._lock = threading.Lock()
+
+    def inc(self, name, label='', value=1):
+        with self._lock:
+            key = (name, label)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, label, ms, error=False):
+        with self._lock:
+            key = (name, label)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(ms, error)
+
+    @contextmanager
+    def timer(self, name, label):
+        """Замерить время блока (в том числе с await внутри)"""
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(name, label, (time.perf_counter() - started) * 1000, error)
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (h.count, h.errors, h.total_ms, h.quantile(0.5), h.quantile(0.95), list(h.counts))
+                for key, h in self.histograms.items()
+            }
+        return counters, histograms
+
+    def summary(self, name):
+        """Строки (метка, вызовов, ошибок, среднее мс, p95 мс) по гистограмме name"""
+        _, histograms = self.snapshot()
+        rows = [
+            (label, count, errors, total_ms / count if count else 0.0, p95)
+            for (hist_name, label), (count, errors, total_ms, _, p95, _) in histograms.items()
+            if hist_name == name
+        ]
+        return sorted(rows, key=lambda row: row[1] * row[3], reverse=True)
+
+    def counter_values(self, name):
+        """{метка: значение} для счетчика name"""
+        counters, _ = self.snapshot()
+        return {label: value for (counter, label), value in counters.items() if counter == name}
+
+    def render_text(self):
+        """Метрики в текстовом формате Prometheus"""
+        counters, histograms = self.snapshot()
+        lines = []
+        for (name, label), value in sorted(counters.items()):
+            lines.append(f'{name}{{name="{label}"}} {value}')
+        for (name, label), (count, errors, total_ms, _, _, counts) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, counts):
+                cumulative += bucket
+                le = '+Inf' if bound == float('inf') else bound
+                lines.append(f'{name}_ms_bucket{{name="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_ms_sum{{name="{label}"}} {total_ms:.3f}')
+            lines.append(f'{name}_ms_count{{name="{label}"}} {count}')
+            lines.append(f'{name}_errors_total{{name="{label}"}} {errors}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+def timed(name, label):
+    """Декоратор: задержка и ошибки вызова функции (обычной или async)"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with METRICS.timer(name, label):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.timer(name, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def report_error(label, message):
+    """Вывести ошибку, которую метод хранилища обработал сам, и учесть ее"""
+    print(message)
+    METRICS.inc('storage_errors_total', label)
+
+
+async def start_metrics_server(host, port):
+    """HTTP-сервер с метриками: GET /metrics"""
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            path = request_line.split(b' ')[1] if request_line.count(b' ') >= 2 else b''
+            if path == b'/metrics':
+                status, body = '200 OK', METRICS.render_text().encode()
+            else:
+                status, body = '404 Not Found', b'not found\n'
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
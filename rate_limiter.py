@@ -0,0 +1,120 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from gspread.exceptions import APIError
+from config import (SHEETS_READS_PER_MIN, SHEETS_WRITES_PER_MIN, SHEETS_BURST,
+                    SHEETS_MAX_RETRIES, SHEETS_BACKOFF_BASE, SHEETS_BACKOFF_MAX)
+from metrics import METRICS
+
+
+# Приоритеты: меньше — раньше
+USER = 0
+BACKGROUND = 1
+
+_local = threading.local()
+
+
+@contextmanager
+def background():
+    """Запросы к Google Sheets внутри блока пропускают вперед запросы пользователей"""
+    previous = getattr(_local, 'priority', USER)
+    _local.priority = BACKGROUND
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority():
+    return getattr(_local, 'priority', USER)
+
+
+class TokenBucket:
+    """Ведро токенов с очередью ожидающих по приоритету"""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._waiters = []  # куча (приоритет, порядок)
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority=USER):
+        """Дождаться токена; ожидающие с более высоким приоритетом получают его первыми"""
+        with self._cond:
+            me = (priority, next(self._order))
+            heapq.heappush(self._waiters, me)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == me and self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate if self.tokens < 1 else None
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(me)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def drain(self):
+        """Квота исчерпана (получили 429): не выдавать токены, пока ведро не наполнится заново"""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+def _retryable(error):
+    if isinstance(error, APIError):
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        return status == 429 or (status is not None and status >= 500)
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class RateLimiter:
+    """Ограничение запросов к Google Sheets по минутным квотам чтения и записи.
+
+    Повторяет запросы при 429 и 5xx с экспоненциальной задержкой и джиттером.
+    """
+
+    def __init__(self, reads_per_min=SHEETS_READS_PER_MIN, writes_per_min=SHEETS_WRITES_PER_MIN,
+                 burst=SHEETS_BURST, max_retries=SHEETS_MAX_RETRIES,
+                 backoff_base=SHEETS_BACKOFF_BASE, backoff_max=SHEETS_BACKOFF_MAX):
+        self.buckets = {
+            'read': TokenBucket(reads_per_min, burst),
+            'write': TokenBucket(writes_per_min, burst),
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def call(self, kind, label, func):
+        """Выполнить запрос func() с учетом квоты kind ('read'/'write')"""
+        bucket = self.buckets[kind]
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            bucket.acquire(current_priority())
+            METRICS.observe('sheets_rate_wait', kind, (time.perf_counter() - started) * 1000)
+            try:
+                return func()
+            except Exception as e:
+                if attempt >= self.max_retries or not _retryable(e):
+                    raise
+                if isinstance(e, APIError):
+                    bucket.drain()
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                attempt += 1
+                METRICS.inc('sheets_retries_total', label)
+                time.sleep(delay)
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import OrderedDict
+from config import CACHE_TTL, CACHE_MAX_SIZE, TASKS_SHEET, NOTES_SHEET, ARCHIVE_SHEET
+
+
+# Вторичные индексы: лист -> поля, по которым записи группируются
+INDEXED_FIELDS = {
+    TASKS_SHEET: ('Project',),
+    NOTES_SHEET: ('Project',),
+    ARCHIVE_SHEET: ('Project',),
+}
+
+
+class _Entry:
+    """Записи листа и индексы по ним"""
+
+    def __init__(self, sheet_name, records):
+        self.loaded_at = time.monotonic()
+        self.records = list(records)
+        self.by_id = {}  # str(ID) -> запись
+        self.groups = {field: {} for field in INDEXED_FIELDS.get(sheet_name, ())}  # поле -> значение -> [записи]
+        for record in self.records:
+            self._index(record)
+
+    def _index(self, record):
+        self.by_id[str(record['ID'])] = record
+        for field, groups in self.groups.items():
+            groups.setdefault(record.get(field), []).append(record)
+
+    def _unindex(self, record):
+        self.by_id.pop(str(record['ID']), None)
+        for field, groups in self.groups.items():
+            group = groups.get(record.get(field))
+            if group is not None:
+                group[:] = [r for r in group if r is not record]
+
+    def append(self, record):
+        self.records.append(record)
+        self._index(record)
+
+    def update(self, record_id, field, value):
+        record = self.by_id.get(str(record_id))
+        if record is None:
+            return
+        if field in self.groups:
+            self._unindex(record)
+            record[field] = value
+            self._index(record)
+        else:
+            record[field] = value
+
+    def remove(self, record_id):
+        record = self.by_id.get(str(record_id))
+        if record is None:
+            return
+        self._unindex(record)
+        self.records[:] = [r for r in self.records if r is not record]
+
+
+class RecordsCache:
+    """Кэш записей листов в памяти.
+
+    Записи каждого листа хранятся целиком и живут не дольше ttl секунд;
+    устаревшие записи можно продлить (revalidate), если таблица не менялась.
+    Операции записи SheetsManager обновляют кэш на месте, поэтому после
+    add_*/update/delete повторное чтение листа не требуется. Для выборок
+    по ID и по проекту поддерживаются индексы, так что их стоимость
+    пропорциональна размеру результата, а не листа.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_size=CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size  # Максимум записей во всех листах вместе
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # лист -> _Entry
+        self._lock = threading.RLock()
+
+    def _fresh(self, sheet_name):
+        entry = self._entries.get(sheet_name)
+        if entry is None or time.monotonic() - entry.loaded_at > self.ttl:
+            return None
+        return entry
+
+    def _hit(self, sheet_name):
+        """Свежая запись кэша с учетом счетчиков попаданий"""
+        entry = self._fresh(sheet_name)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(sheet_name)
+        return entry
+
+    def get(self, sheet_name):
+        """Записи листа или None, если их нет в кэше"""
+        with self._lock:
+            entry = self._hit(sheet_name)
+            return list(entry.records) if entry else None
+
+    def find(self, sheet_name, record_id):
+        """(True, запись или None) если лист в кэше, иначе (False, None)"""
+        with self._lock:
+            entry = self._hit(sheet_name)
+            if entry is None:
+                return False, None
+            return True, entry.by_id.get(str(record_id))
+
+    def lookup(self, sheet_name, field, value):
+        """Записи с record[field] == value или None, если листа нет в кэше"""
+        with self._lock:
+            entry = self._hit(sheet_name)
+            if entry is None:
+                return None
+            if field in entry.groups:
+                return list(entry.groups[field].get(value, []))
+            return [r for r in entry.records if r.get(field) == value]
+
+    def set(self, sheet_name, records):
+        """Сохранить записи листа"""
+        with self._lock:
+            self._entries.pop(sheet_name, None)
+            if len(records) > self.max_size:
+                return
+            self._entries[sheet_name] = _Entry(sheet_name, records)
+            # Вытесняем давно не использованные листы
+            while sum(len(e.records) for e in self._entries.values()) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def append(self, sheet_name, record):
+        """Добавить запись в закэшированный лист"""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is not None:
+                entry.append(record)
+
+    def update(self, sheet_name, record_id, field, value):
+        """Изменить поле записи с указанным ID"""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is not None:
+                entry.update(record_id, field, value)
+
+    def remove(self, sheet_name, record_id):
+        """Удалить запись с указанным ID"""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is not None:
+                entry.remove(record_id)
+
+    def revalidate(self, sheet_name):
+        """Продлить срок жизни записей листа (в том числе устаревших).
+
+        Вызывается, когда известно, что таблица не менялась с момента чтения.
+        False, если записей листа в кэше нет.
+        """
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is None:
+                return False
+            entry.loaded_at = time.monotonic()
+            return True
+
+    def expire(self, sheet_name=None):
+        """Считать записи листа (или всех листов) устаревшими, не удаляя их"""
+        with self._lock:
+            names = [sheet_name] if sheet_name is not None else list(self._entries)
+            for name in names:
+                if name in self._entries:
+                    self._entries[name].loaded_at = float('-inf')
+
+    def invalidate(self, sheet_name=None):
+        """Сбросить кэш листа (или всех листов)"""
+        with self._lock:
+            if sheet_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(sheet_name, None)
+
+    def stats(self):
+        """Счетчики попаданий и промахов"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'sheets': len(self._entries),
+                'records': sum(len(e.records) for e in self._entries.values()),
+            }
@@ -0,0 +1,178 @@
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta
+from config import REMINDER_CHAT_IDS, REMINDER_HOUR, REMINDER_DAYS_BEFORE, REMINDER_RETRY_DELAY, TASKS_SHEET
+from telegram_sender import SENDER
+
+logger = logging.getLogger(__name__)
+
+
+def parse_deadline(value):
+    """Дата дедлайна из колонки Deadline (YYYY-MM-DD) или None"""
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+class ReminderQueue:
+    """Куча ближайших напоминаний: (время, порядок, ID задачи, поколение).
+
+    Изменение задачи увеличивает ее поколение, и старые элементы кучи
+    отбрасываются при извлечении — удалять их из середины кучи не нужно.
+    """
+
+    def __init__(self, hour=REMINDER_HOUR, days_before=REMINDER_DAYS_BEFORE):
+        self.hour = hour
+        self.days_before = days_before
+        self._heap = []
+        self._order = itertools.count()
+        self._tasks = {}  # str(ID) -> (поколение, задача)
+        self._generation = itertools.count()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def _due_times(self, task):
+        deadline = parse_deadline(task.get('Deadline', ''))
+        if deadline is None:
+            return []
+        at = deadline.replace(hour=self.hour)
+        return [time.mktime((at - timedelta(days=days)).timetuple()) for days in self.days_before]
+
+    def _entries(self, task, now):
+        """Элементы кучи для задачи; задача запоминается, пока у нее есть будущие напоминания"""
+        generation = next(self._generation)
+        due_times = [due for due in self._due_times(task) if due > now]
+        if not due_times:
+            return []
+        # Выполненную задачу помним без напоминаний: ее могут вернуть в работу
+        self._tasks[str(task['ID'])] = (generation, task)
+        if task.get('Status') == 'done':
+            return []
+        return [(due, next(self._order), str(task['ID']), generation) for due in due_times]
+
+    def load(self, tasks, now=None):
+        """Заполнить очередь по списку задач (одно чтение листа при старте)"""
+        now = time.time() if now is None else now
+        self._tasks.clear()
+        self._heap = [entry for task in tasks for entry in self._entries(task, now)]
+        heapq.heapify(self._heap)
+
+    def update(self, task, now=None):
+        """Новая задача или изменение существующей"""
+        now = time.time() if now is None else now
+        self._tasks.pop(str(task['ID']), None)
+        for entry in self._entries(task, now):
+            heapq.heappush(self._heap, entry)
+
+    def status_changed(self, task_id, status):
+        entry = self._tasks.get(str(task_id))
+        if entry is not None:
+            self.update(dict(entry[1], Status=status))
+
+    def _valid(self, entry):
+        current = self._tasks.get(entry[2])
+        return current is not None and current[0] == entry[3]
+
+    def next_due(self):
+        """Время ближайшего напоминания или None"""
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Задачи, напоминания по которым наступили"""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._valid(entry):
+                due.append(self._tasks[entry[2]][1])
+        return due
+
+
+def reminder_text(task, today=None):
+    today = today or datetime.now().date()
+    days = (parse_deadline(task['Deadline']).date() - today).days
+    when = "сегодня" if days <= 0 else "завтра" if days == 1 else f"через {days} дн."
+    return f"⏰ Дедлайн {when}: {task['ID']}. {task['Title']}\n📁 {task['Project']} · 📅 {task['Deadline']}"
+
+
+class DeadlineReminders:
+    """Напоминания о дедлайнах через JobQueue приложения.
+
+    В JobQueue всегда одно задание — на время ближайшего напоминания; после
+    срабатывания или изменения очереди оно переставляется на следующее.
+    Лист задач читается один раз при старте (при ошибке — повторно, пока
+    не прочитается), дальше очередь обновляется событиями
+    add_task/update_task_status хранилища.
+    """
+
+    def __init__(self, chat_ids=REMINDER_CHAT_IDS, retry_delay=REMINDER_RETRY_DELAY):
+        self.chat_ids = chat_ids
+        self.retry_delay = retry_delay
+        self.queue = ReminderQueue()
+        self.storage = None
+        self.job_queue = None
+        self._job = None
+        self._job_due = None
+
+    async def start(self, application, storage):
+        if application.job_queue is None:
+            logger.warning("Напоминания отключены: установите python-telegram-bot[job-queue]")
+            return
+        if not self.chat_ids:
+            logger.warning("Напоминания отключены: не задан REMINDER_CHAT_IDS")
+            return
+        self.job_queue = application.job_queue
+        self.storage = storage
+        await self._load()
+
+    async def _load(self, context=None):
+        """Заполнить очередь по листу задач; если хранилище недоступно — повторить позже"""
+        try:
+            tasks = await self.storage.load_records(TASKS_SHEET)
+        except Exception as e:
+            logger.error("Напоминания: не удалось прочитать задачи, повтор через %.0f с: %s", self.retry_delay, e)
+            self.job_queue.run_once(self._load, when=self.retry_delay, name='deadline_reminders_load')
+            return
+        self.queue.load(tasks)
+        self.storage.subscribe(self.on_change)
+        self._reschedule()
+        logger.info("Напоминания: %d задач с дедлайнами", len(self.queue))
+
+    def on_change(self, event, record):
+        """Событие хранилища: 'task_added' (запись задачи) или 'task_status' (ID и Status)"""
+        if event == 'task_added':
+            self.queue.update(record)
+        elif event == 'task_status':
+            self.queue.status_changed(record['ID'], record['Status'])
+        else:
+            return
+        self._reschedule()
+
+    def _reschedule(self):
+        due = self.queue.next_due()
+        if due == self._job_due:
+            return
+        if self._job is not None:
+            self._job.schedule_removal()
+            self._job = None
+        self._job_due = due
+        if due is not None:
+            self._job = self.job_queue.run_once(self._fire, when=max(0.0, due - time.time()),
+                                                name='deadline_reminders')
+
+    async def _fire(self, context):
+        self._job = None
+        self._job_due = None
+        for task in self.queue.pop_due():
+            for chat_id in self.chat_ids:
+                try:
+                    await SENDER.send(context.bot, chat_id, reminder_text(task))
+                except Exception as e:
+                    logger.error("Ошибка отправки напоминания в чат %s: %s", chat_id, e)
+        self._reschedule()
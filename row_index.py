@@ -0,0 +1,76 @@
+import re
+import threading
+import time
+from config import CACHE_TTL
+
+
+class RowIndex:
+    """Индекс ID -> номер строки для каждого листа.
+
+    Строится лениво (из кэша записей или по одной колонке ID) и живет не
+    дольше ttl секунд, чтобы ручные правки таблицы не приводили к записи
+    в чужую строку. После удаления строки номера ниже нее сдвигаются.
+    """
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self._rows = {}  # лист -> (время построения, {ID: строка})
+        self._lock = threading.RLock()
+
+    def _fresh(self, sheet_name):
+        entry = self._rows.get(sheet_name)
+        if entry is None:
+            return None
+        built_at, rows = entry
+        if time.monotonic() - built_at > self.ttl:
+            del self._rows[sheet_name]
+            return None
+        return rows
+
+    def find(self, sheet_name, record_id):
+        """Номер строки записи, None если нет записи, False если индекс не построен"""
+        with self._lock:
+            rows = self._fresh(sheet_name)
+            if rows is None:
+                return False
+            return rows.get(str(record_id))
+
+    def build(self, sheet_name, ids):
+        """Построить индекс по списку ID в порядке строк (без заголовка)"""
+        with self._lock:
+            rows = {str(record_id): i for i, record_id in enumerate(ids, start=2) if str(record_id) != ''}
+            self._rows[sheet_name] = (time.monotonic(), rows)
+
+    def add(self, sheet_name, record_id, row):
+        """Запомнить строку новой записи"""
+        with self._lock:
+            rows = self._fresh(sheet_name)
+            if rows is not None:
+                rows[str(record_id)] = row
+
+    def remove(self, sheet_name, record_id):
+        """Удалить запись и сдвинуть строки ниже нее"""
+        with self._lock:
+            rows = self._fresh(sheet_name)
+            if rows is None:
+                return
+            removed = rows.pop(str(record_id), None)
+            if removed is None:
+                return
+            for key, row in rows.items():
+                if row > removed:
+                    rows[key] = row - 1
+
+    def invalidate(self, sheet_name=None):
+        """Сбросить индекс листа (или всех листов)"""
+        with self._lock:
+            if sheet_name is None:
+                self._rows.clear()
+            else:
+                self._rows.pop(sheet_name, None)
+
+
+def row_from_range(updated_range):
+    """Номер строки из диапазона вида 'Tasks!A12:H12'"""
+    match = re.search(r'![A-Z]+(\d+)', updated_range or '')
+    return int(match.group(1)) if match else None
@@ -0,0 +1,125 @@
+import bisect
+import heapq
+import math
+import re
+from config import PROJECTS_SHEET, NOTES_SHEET, TASKS_SHEET
+
+
+# Индексируемые поля листов и их веса в ранжировании
+FIELDS = {
+    PROJECTS_SHEET: {'Name': 3.0, 'Description': 1.0},
+    NOTES_SHEET: {'Title': 3.0, 'Tags': 2.0, 'Content': 1.0},
+    TASKS_SHEET: {'Title': 3.0, 'Description': 1.0},
+}
+
+# Совпадение по префиксу весит меньше точного
+PREFIX_BOOST = 0.5
+# Не больше стольких терминов на одно слово запроса при поиске по префиксу
+MAX_PREFIX_TERMS = 200
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре (кириллица и латиница, ё -> е)"""
+    return re.findall(r'\w+', str(text).lower().replace('ё', 'е'))
+
+
+class InvertedIndex:
+    """Обратный индекс записей одного листа: термин -> {ID: вес}"""
+
+    def __init__(self, fields, records=()):
+        self.fields = fields
+        self.postings = {}
+        self.records = {}  # ID -> запись
+        for record in records:
+            self._add(record)
+        self.terms = sorted(self.postings)  # для поиска по префиксу
+
+    def _add(self, record, new_terms=None):
+        record_id = record['ID']
+        self.records[record_id] = record
+        for field, weight in self.fields.items():
+            for term in tokenize(record.get(field, '')):
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = {}
+                    if new_terms is not None:
+                        new_terms.append(term)
+                posting[record_id] = posting.get(record_id, 0.0) + weight
+
+    def add(self, record):
+        """Добавить (или заменить) запись"""
+        if record['ID'] in self.records:
+            self.remove(record['ID'])
+        new_terms = []
+        self._add(record, new_terms)
+        for term in new_terms:
+            bisect.insort(self.terms, term)
+
+    def remove(self, record_id):
+        """Убрать запись из индекса"""
+        record = self.records.pop(record_id, None)
+        if record is None:
+            return
+        for field in self.fields:
+            for term in set(tokenize(record.get(field, ''))):
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                posting.pop(record_id, None)
+                if not posting:
+                    del self.postings[term]
+                    i = bisect.bisect_left(self.terms, term)
+                    if i < len(self.terms) and self.terms[i] == term:
+                        del self.terms[i]
+
+    def _expand(self, token):
+        """Термины, начинающиеся с token (однобуквенные слова — только точно)"""
+        if len(token) < 2:
+            return [token] if token in self.postings else []
+        start = bisect.bisect_left(self.terms, token)
+        end = bisect.bisect_left(self.terms, token + '\uffff', start, min(len(self.terms), start + MAX_PREFIX_TERMS))
+        return self.terms[start:end]
+
+    def search(self, tokens):
+        """{ID: оценка} записей, содержащих все слова запроса (целиком или префиксом)"""
+        total = len(self.records)
+        words = []
+        for token in tokens:
+            weighted = [
+                (self.postings[term], math.log(1 + total / len(self.postings[term])) *
+                 (1.0 if term == token else PREFIX_BOOST))
+                for term in self._expand(token)
+            ]
+            if not weighted:
+                return {}
+            words.append((sum(len(posting) for posting, _ in weighted), weighted))
+
+        # Начинаем с самого редкого слова, остальные проверяем только у найденных записей
+        words.sort(key=lambda word: word[0])
+        scores = {}
+        for posting, weight in words[0][1]:
+            for record_id, tf in posting.items():
+                scores[record_id] = scores.get(record_id, 0.0) + tf * weight
+        for _, weighted in words[1:]:
+            matched = {}
+            for record_id, score in scores.items():
+                extra = sum(posting.get(record_id, 0.0) * weight for posting, weight in weighted)
+                if extra:
+                    matched[record_id] = score + extra
+            scores = matched
+            if not scores:
+                break
+        return scores
+
+
+def search(indexes, query, limit=10):
+    """Лучшие совпадения по нескольким листам: [(оценка, лист, запись)]"""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    results = []
+    for sheet_name, index in indexes.items():
+        for record_id, score in index.search(tokens).items():
+            results.append((score, sheet_name, index.records[record_id]))
+    # При равной оценке — более новые записи выше
+    return heapq.nlargest(limit, results, key=lambda item: (item[0], str(item[2]['ID']).zfill(12)))
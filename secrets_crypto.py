@@ -0,0 +1,77 @@
+import base64
+import functools
+import logging
+import os
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from config import SECRETS_KEY, SECRETS_KEY_SALT
+
+logger = logging.getLogger(__name__)
+
+
+# Префикс зашифрованного значения колонки Data (версия формата)
+PREFIX = 'enc1:'
+# Параметры scrypt: ~50-100 мс на вывод ключа — выполняется один раз на процесс
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+NONCE_SIZE = 12
+# Связывает шифротекст с колонкой: значение, перенесенное в другое поле, не расшифруется
+ASSOCIATED_DATA = b'Secrets.Data'
+
+
+class SecretError(Exception):
+    """Значение нельзя расшифровать: другой ключ или поврежденные данные"""
+
+
+@functools.lru_cache(maxsize=None)
+def derive_key(passphrase, salt):
+    """256-битный ключ из мастер-пароля (дорогой вызов, результат кэшируется)"""
+    kdf = Scrypt(salt=salt.encode(), length=32, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return kdf.derive(passphrase.encode())
+
+
+@functools.lru_cache(maxsize=None)
+def _cipher(passphrase, salt):
+    return AESGCM(derive_key(passphrase, salt))
+
+
+def encryption_enabled():
+    """Задан ли мастер-ключ SECRETS_KEY"""
+    return bool(SECRETS_KEY)
+
+
+def is_encrypted(value):
+    return str(value).startswith(PREFIX)
+
+
+def encrypt(text, passphrase=SECRETS_KEY, salt=SECRETS_KEY_SALT):
+    """Зашифровать значение (AES-256-GCM, случайный nonce на запись); без ключа — как есть"""
+    if not passphrase:
+        return text
+    nonce = os.urandom(NONCE_SIZE)
+    sealed = _cipher(passphrase, salt).encrypt(nonce, str(text).encode(), ASSOCIATED_DATA)
+    return PREFIX + base64.urlsafe_b64encode(nonce + sealed).decode()
+
+
+def decrypt(value, passphrase=SECRETS_KEY, salt=SECRETS_KEY_SALT):
+    """Расшифровать значение; незашифрованное (до миграции) возвращается как есть"""
+    value = str(value)
+    if not is_encrypted(value):
+        return value
+    if not passphrase:
+        raise SecretError("Не задан SECRETS_KEY")
+    try:
+        raw = base64.urlsafe_b64decode(value[len(PREFIX):])
+        return _cipher(passphrase, salt).decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], ASSOCIATED_DATA).decode()
+    except (InvalidTag, ValueError) as e:
+        raise SecretError("Не удалось расшифровать секрет") from e
+
+
+def warm_up():
+    """Вывести ключ заранее, чтобы первый запрос с секретом не ждал scrypt"""
+    if encryption_enabled():
+        _cipher(SECRETS_KEY, SECRETS_KEY_SALT)
+    else:
+        logger.warning("SECRETS_KEY не задан: секреты хранятся без шифрования")
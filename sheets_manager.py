@@ -1,61 +1,519 @@
+import threading
+import time
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-from config import CREDENTIALS_FILE, SHEET_ID
+from gspread.utils import rowcol_to_a1, numericise_all
+from config import (CREDENTIALS_FILE, SHEET_ID, WRITE_BEHIND, META_SHEET, CACHE_TTL, CHANGE_PROBE,
+                    PROJECTS_SHEET, TASKS_SHEET, NOTES_SHEET, SECRETS_SHEET, ARCHIVE_SHEET)
 from datetime import datetime
+from storage import Storage, HEADERS
+from records_cache import RecordsCache
+from id_allocator import IdAllocator
+from row_index import RowIndex, row_from_range
+from write_queue import WriteBehindQueue
+from metrics import METRICS, report_error
+from rate_limiter import RateLimiter
+from secrets_crypto import encrypt, is_encrypted, encryption_enabled
 
 
-class SheetsManager:
-    def __init__(self):
+# Запросы, расходующие квоту чтения (остальные — квоту записи)
+READ_METHODS = {'worksheets', 'worksheet', 'get_all_records', 'get_all_values', 'col_values', 'values_batch_get',
+                'get_lastUpdateTime'}
+
+
+def _text_columns(sheet_name):
+    """Номера колонок (с 1), которые читаются как есть: все, кроме ID.
+
+    get_all_records по умолчанию превращает похожий на число текст в число
+    ('007' -> 7, '+79991234567' -> 79991234567) — для названий, описаний
+    и секретов это порча данных.
+    """
+    return list(range(2, len(HEADERS[sheet_name]) + 1))
+
+
+def _layout_changed(error):
+    """Ошибка API из-за переименованного/удаленного/пересозданного листа"""
+    if isinstance(error, gspread.exceptions.WorksheetNotFound):
+        return True
+    text = str(error)
+    return 'Unable to parse range' in text or 'No grid with id' in text
+
+
+class SheetsManager(Storage):
+    """Хранилище в Google Sheets.
+
+    Подключение ленивое: авторизация, открытие таблицы и создание листов
+    выполняются в connect() — при первом обращении или в фоне при старте бота.
+    """
+
+    def __init__(self, spreadsheet=None, limiter=None):
+        super().__init__()
         self.scope = ['https://spreadsheets.google.com/feeds',
                       'https://www.googleapis.com/auth/drive']
-        self.creds = ServiceAccountCredentials.from_json_keyfile_name(
-            CREDENTIALS_FILE, self.scope)
-        self.client = gspread.authorize(self.creds)
-        self.sheet = self.client.open_by_key(SHEET_ID)
-        self._initialize_sheets()
+        self._spreadsheet = spreadsheet
+        self._ids = None
+        self._connect_lock = threading.Lock()
+        self._worksheets = {}  # название листа -> Worksheet
+        self.cache = RecordsCache()
+        self.rows = RowIndex()
+        self._counts = {}  # лист -> (время подсчета, число записей) для постраничного чтения
+        self.limiter = limiter or RateLimiter()
+        # Проверка изменений перед повторным чтением листа (выключается при ошибке Drive API)
+        self.probe = CHANGE_PROBE
+        self._stamps = {}  # лист -> время изменения таблицы на момент чтения
+        # Отложенная пакетная запись (включается WRITE_BEHIND=1)
+        self.writer = WriteBehindQueue(self._write_batch) if WRITE_BEHIND else None
+
+    def connect(self):
+        """Подключиться к таблице и подготовить листы (повторные вызовы ничего не делают)"""
+        with self._connect_lock:
+            if self._ids is not None:
+                return
+            if self._spreadsheet is None:
+                creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, self.scope)
+                self._spreadsheet = gspread.authorize(creds).open_by_key(SHEET_ID)
+            self._initialize_sheets()
+            self._ids = self._initialize_ids()
+
+    @property
+    def connected(self):
+        return self._ids is not None
+
+    @property
+    def sheet(self):
+        self.connect()
+        return self._spreadsheet
+
+    @property
+    def ids(self):
+        self.connect()
+        return self._ids
 
     def _initialize_sheets(self):
-        """Создает листы если их нет"""
+        """Создает недостающие листы с заголовками одним пакетным запросом"""
         try:
-            worksheets = [ws.title for ws in self.sheet.worksheets()]
+            self._load_worksheets()
+
+            wanted = dict(HEADERS)
+            wanted[META_SHEET] = ['Sheet', 'LastID']
+            missing = [title for title in wanted if title not in self._worksheets]
+            if not missing:
+                return
+
+            next_id = max([ws.id for ws in self._worksheets.values()] + [0]) + 1
+            requests = []
+            for offset, title in enumerate(missing):
+                sheet_id = next_id + offset
+                requests.append({'addSheet': {'properties': {
+                    'sheetId': sheet_id,
+                    'title': title,
+                    'hidden': title == META_SHEET,
+                    'gridProperties': {'rowCount': 1000, 'columnCount': len(wanted[title])},
+                }}})
+                requests.append({'updateCells': {
+                    'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': 0},
+                    'rows': [{'values': [{'userEnteredValue': {'stringValue': h}} for h in wanted[title]]}],
+                    'fields': 'userEnteredValue',
+                }})
+            self._api(self._spreadsheet, 'batch_update', {'requests': requests})
+            self._load_worksheets()
+        except Exception as e:
+            report_error('initialize_sheets', f"Ошибка инициализации таблиц: {e}")
+
+    def _load_worksheets(self):
+        """Получить дескрипторы всех листов одним запросом"""
+        self._worksheets = {ws.title: ws for ws in self._api(self._spreadsheet, 'worksheets')}
+
+    def _worksheet(self, sheet_name):
+        """Дескриптор листа без лишнего запроса метаданных"""
+        ws = self._worksheets.get(sheet_name)
+        if ws is None:
+            ws = self._api(self._spreadsheet, 'worksheet', sheet_name)
+            self._worksheets[sheet_name] = ws
+        return ws
+
+    def _api(self, target, method, *args, **kwargs):
+        """Запрос к Google Sheets API: квоты, повторы при 429/5xx, метрики"""
+        def request():
+            METRICS.inc('sheets_api_calls_total', method)
+            with METRICS.timer('sheets_api', method):
+                return getattr(target, method)(*args, **kwargs)
+
+        kind = 'read' if method in READ_METHODS else 'write'
+        return self.limiter.call(kind, method, request)
+
+    def _ws_call(self, sheet_name, method, *args, **kwargs):
+        """Вызвать метод листа; если разметка таблицы изменилась — обновить дескрипторы и повторить"""
+        self.connect()
+        try:
+            return self._api(self._worksheet(sheet_name), method, *args, **kwargs)
+        except (gspread.exceptions.APIError, gspread.exceptions.WorksheetNotFound) as e:
+            if not _layout_changed(e):
+                raise
+            self._load_worksheets()
+            return self._api(self._worksheet(sheet_name), method, *args, **kwargs)
+
+    def _initialize_ids(self):
+        """Засеять счетчики ID одним пакетным чтением колонок ID"""
+        titles = list(HEADERS)
+        ranges = [f"'{META_SHEET}'!A2:B"] + [f"'{title}'!A2:A" for title in titles]
+        response = self._api(self._spreadsheet, 'values_batch_get', ranges, params={'majorDimension': 'COLUMNS'})
+        columns = [vr.get('values', []) for vr in response.get('valueRanges', [])]
+        meta_columns = columns[0] if columns else []
+        # Колонки _Meta -> строки [Sheet, LastID]
+        meta_values = list(zip(*meta_columns)) if len(meta_columns) == 2 else []
+        ids = IdAllocator(meta_values)
+        for title, column in zip(titles, columns[1:]):
+            ids.seed(title, column[0] if column else [])
+        return ids
+
+    def _probe(self):
+        """Время последнего изменения таблицы (Drive modifiedTime) или None"""
+        if not self.probe:
+            return None
+        self.connect()
+        try:
+            return self._api(self._spreadsheet, 'get_lastUpdateTime')
+        except Exception as e:
+            self.probe = False
+            report_error('probe', f"Проверка изменений таблицы отключена: {e}")
+            return None
+
+    def _get_records(self, sheet_name):
+        """Записи листа: из кэша или из Google Sheets при промахе.
+
+        Перед повторным чтением устаревшего листа запрашивается время изменения
+        таблицы: если оно не изменилось, записи в кэше продлеваются без чтения.
+        Собственные записи бота тоже меняют это время, поэтому после них лист
+        один раз перечитывается.
+        """
+        records = self.cache.get(sheet_name)
+        if records is not None:
+            return records
+        # Незаписанные изменения должны попасть в прочитанные данные
+        if self.writer and self.writer.pending(sheet_name):
+            self.writer.flush(sheet_name)
+        stamp = self._probe()
+        if stamp is not None and stamp == self._stamps.get(sheet_name) and self.cache.revalidate(sheet_name):
+            METRICS.inc('sheets_probe_total', 'unchanged')
+            return self.cache.get(sheet_name)
+        if stamp is not None and sheet_name in self._stamps:
+            # Таблица изменилась: строки могли сдвинуться, экраны устарели
+            METRICS.inc('sheets_probe_total', 'changed')
+            self.rows.invalidate(sheet_name)
+            self._counts.pop(sheet_name, None)
+            with self._writing(sheet_name):
+                return self._read_records(sheet_name, stamp)
+        return self._read_records(sheet_name, stamp)
+
+    def _read_records(self, sheet_name, stamp):
+        """Прочитать лист целиком и положить записи в кэш.
+
+        Если во время чтения лист записали, прочитанное могло не включать
+        запись — такие записи возвращаются, но не кэшируются.
+        """
+        version = self.data_version(sheet_name)
+        records = self._ws_call(sheet_name, 'get_all_records', numericise_ignore=_text_columns(sheet_name))
+        if self.data_version(sheet_name) == version:
+            self.cache.set(sheet_name, records)
+            self._stamps[sheet_name] = stamp
+        return records
+
+    def _lookup(self, sheet_name, field, value):
+        """Записи листа с record[field] == value через индекс кэша"""
+        records = self.cache.lookup(sheet_name, field, value)
+        if records is None:
+            records = self._get_records(sheet_name)
+            # Лист больше CACHE_MAX_SIZE в кэш не попадает — фильтруем сами
+            cached = self.cache.lookup(sheet_name, field, value)
+            records = cached if cached is not None else [r for r in records if r[field] == value]
+        return records
+
+    def _find_row(self, sheet_name, record_id):
+        """Номер строки записи по индексу ID -> строка"""
+        row = self.rows.find(sheet_name, record_id)
+        if row is False:
+            records = self.cache.get(sheet_name)
+            if records is not None:
+                ids = [r['ID'] for r in records]
+            else:
+                ids = self._ws_call(sheet_name, 'col_values', 1)[1:]
+            self.rows.build(sheet_name, ids)
+            row = self.rows.find(sheet_name, record_id)
+        return row
+
+    def _count_changed(self, sheet_name, delta):
+        """Поправить известное число записей листа после вставки/удаления"""
+        entry = self._counts.get(sheet_name)
+        if entry:
+            self._counts[sheet_name] = (entry[0], entry[1] + delta)
+
+    def _append(self, sheet_name, row):
+        """Добавить строку в лист и в кэш"""
+        self._append_rows(sheet_name, [row])
+
+    def _append_rows(self, sheet_name, rows):
+        """Добавить строки в лист (одним запросом) и в кэш"""
+        with self._writing(sheet_name):
+            self._count_changed(sheet_name, len(rows))
+            if self.writer:
+                self.writer.append(sheet_name, *rows)
+            elif len(rows) == 1:
+                response = self._ws_call(sheet_name, 'append_row', rows[0])
+            else:
+                response = self._ws_call(sheet_name, 'append_rows', rows)
+            for row in rows:
+                self.cache.append(sheet_name, dict(zip(HEADERS[sheet_name], row)))
+            if not self.writer:
+                self._index_appended(sheet_name, rows, response)
+
+    def _update_cell(self, sheet_name, record_id, col, value):
+        """Изменить ячейку записи (и запись в кэше). False, если записи нет"""
+        with self._writing(sheet_name):
+            if not (self.writer and self.writer.update_pending(sheet_name, record_id, col, value)):
+                row = self._find_row(sheet_name, record_id)
+                if not row:
+                    return False
+                if self.writer:
+                    self.writer.update(sheet_name, row, col, value)
+                else:
+                    self._ws_call(sheet_name, 'update_cell', row, col, value)
+            self.cache.update(sheet_name, record_id, HEADERS[sheet_name][col - 1], value)
+            return True
+
+    def _update_cells(self, sheet_name, record_ids, col, value):
+        """Записать одно значение в колонку нескольких записей. ID найденных записей"""
+        return self._update_values(sheet_name, col, {record_id: value for record_id in record_ids})
+
+    def _update_values(self, sheet_name, col, values):
+        """Изменить колонку нескольких записей ({ID: значение}) одним batch_update и в кэше. ID найденных записей"""
+        field = HEADERS[sheet_name][col - 1]
+        with self._writing(sheet_name):
+            updated, cells = [], []
+            for record_id, value in values.items():
+                found, record = self.cache.find(sheet_name, record_id)
+                if found and record is not None and record[field] == value:
+                    # Значение уже такое — ячейку не пишем
+                    updated.append(record_id)
+                    continue
+                if self.writer and self.writer.update_pending(sheet_name, record_id, col, value):
+                    updated.append(record_id)
+                    continue
+                row = self._find_row(sheet_name, record_id)
+                if not row:
+                    continue
+                updated.append(record_id)
+                if self.writer:
+                    self.writer.update(sheet_name, row, col, value)
+                else:
+                    cells.append({'range': rowcol_to_a1(row, col), 'values': [[value]]})
+            if cells:
+                self._ws_call(sheet_name, 'batch_update', cells)
+            for record_id in updated:
+                self.cache.update(sheet_name, record_id, field, values[record_id])
+            return updated
+
+    def _index_appended(self, sheet_name, rows, response):
+        """Запомнить номера строк, добавленных append_row(s)"""
+        first = row_from_range((response or {}).get('updates', {}).get('updatedRange'))
+        if not first:
+            self.rows.invalidate(sheet_name)
+            return
+        for offset, row in enumerate(rows):
+            self.rows.add(sheet_name, row[0], first + offset)
+
+    def _write_batch(self, sheet_name, appends, updates):
+        """Записать пакет изменений листа: один batch_update и один append_rows"""
+        if updates:
+            self._ws_call(sheet_name, 'batch_update', [
+                {'range': rowcol_to_a1(row, col), 'values': [[value]]}
+                for (row, col), value in updates.items()
+            ])
+        if appends:
+            response = self._ws_call(sheet_name, 'append_rows', appends)
+            self._index_appended(sheet_name, appends, response)
+
+    def _flush_before_shift(self, sheet_name):
+        """Сбросить очередь перед удалением строк листа.
+
+        Изменения в очереди адресованы номерами строк: если сброс не удался,
+        после удаления они попали бы в чужие записи, поэтому удаление отменяется.
+        """
+        if not self.writer:
+            return
+        self.writer.flush()
+        if self.writer.pending(sheet_name):
+            raise RuntimeError(f"не удалось записать очередь изменений листа {sheet_name}, удаление строк отложено")
+
+    def _delete(self, sheet_name, record_id):
+        """Удалить строку записи. False, если записи нет"""
+        self._flush_before_shift(sheet_name)
+        with self._writing(sheet_name):
+            row = self._find_row(sheet_name, record_id)
+            if not row:
+                return False
+            self._ws_call(sheet_name, 'delete_rows', row)
+            self.rows.remove(sheet_name, record_id)
+            self.cache.remove(sheet_name, record_id)
+            self._count_changed(sheet_name, -1)
+        self._ws_call(META_SHEET, 'update', *self.ids.persist(sheet_name))
+        return True
+
+    def _move(self, source, target, records):
+        """Перенести записи в другой лист: один append_rows и один batch_update с удалением строк.
+
+        ID записей не меняются. Если прошлый перенос прервался после
+        добавления, уже перенесенные строки второй раз не добавляются.
+        """
+        if not records:
+            return []
+        self._flush_before_shift(source)
+        with self._writing(source), self._writing(target):
+            moved = {str(record['ID']) for record in records}
+
+            present = {str(value) for value in self._ws_call(target, 'col_values', 1)[1:]}
+            rows = [[record.get(h, '') for h in HEADERS[target]] for record in records
+                    if str(record['ID']) not in present]
+            if rows:
+                self._ws_call(target, 'append_rows', rows)
+                self._count_changed(target, len(rows))
+                for row in rows:
+                    self.cache.append(target, dict(zip(HEADERS[target], row)))
+                self.rows.invalidate(target)
+
+            # Номера строк берем из свежей колонки ID: индекс строк мог устареть после ручных правок
+            ids = self._ws_call(source, 'col_values', 1)
+            doomed = [i for i, value in enumerate(ids) if i > 0 and str(value) in moved]
+            spans = []
+            for i in doomed:
+                if spans and spans[-1][1] == i:
+                    spans[-1][1] = i + 1
+                else:
+                    spans.append([i, i + 1])
+            sheet_id = self._worksheet(source).id
+            if spans:
+                # Снизу вверх, чтобы удаление не сдвигало еще не удаленные диапазоны
+                self._api(self._spreadsheet, 'batch_update', {'requests': [
+                    {'deleteDimension': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS',
+                                                   'startIndex': start, 'endIndex': end}}}
+                    for start, end in reversed(spans)
+                ]})
+            self.rows.build(source, [value for i, value in enumerate(ids) if i > 0 and str(value) not in moved])
+            for record in records:
+                self.cache.remove(source, record['ID'])
+            self._count_changed(source, -len(doomed))
+        self._ws_call(META_SHEET, 'update', *self.ids.persist(source))
+        return [record['ID'] for record in records]
+
+    # Операции зеркала SQLite: ID уже выданы основным хранилищем, ошибки пробрасываются
+    def load_records(self, sheet_name):
+        """Все записи листа"""
+        return self._get_records(sheet_name)
+
+    def mirror_append(self, sheet_name, row):
+        """Добавить строку с готовым ID"""
+        self.mirror_append_rows(sheet_name, [row])
+
+    def mirror_append_rows(self, sheet_name, rows):
+        """Добавить строки с готовыми ID одним запросом"""
+        # Счетчик сохраняется в _Meta при удалении — он не должен отставать от выданных SQLite ID
+        self.ids.seed(sheet_name, [row[0] for row in rows])
+        self._append_rows(sheet_name, rows)
+
+    def mirror_update(self, sheet_name, record_id, field, value):
+        """Изменить поле записи"""
+        self._update_cell(sheet_name, record_id, HEADERS[sheet_name].index(field) + 1, value)
 
-            # Projects sheet
-            if 'Projects' not in worksheets:
-                ws = self.sheet.add_worksheet(title='Projects', rows=1000, cols=5)
-                ws.append_row(['ID', 'Name', 'Description', 'Created', 'Status'])
+    def mirror_update_many(self, sheet_name, record_ids, field, value):
+        """Изменить поле нескольких записей одним запросом"""
+        self._update_cells(sheet_name, record_ids, HEADERS[sheet_name].index(field) + 1, value)
 
-            # Tasks sheet
-            if 'Tasks' not in worksheets:
-                ws = self.sheet.add_worksheet(title='Tasks', rows=1000, cols=8)
-                ws.append_row(['ID', 'Project', 'Title', 'Description', 'Status', 'Priority', 'Deadline', 'Created'])
+    def mirror_archive(self, task_ids):
+        """Перенести задачи с указанными ID в архив"""
+        wanted = {str(task_id) for task_id in task_ids}
+        self._move(TASKS_SHEET, ARCHIVE_SHEET, [t for t in self._get_records(TASKS_SHEET) if str(t['ID']) in wanted])
 
-            # Notes sheet
-            if 'Notes' not in worksheets:
-                ws = self.sheet.add_worksheet(title='Notes', rows=1000, cols=6)
-                ws.append_row(['ID', 'Title', 'Content', 'Tags', 'Created', 'Project'])
+    def mirror_update_values(self, sheet_name, field, values):
+        """Записать в поле разные значения ({ID: значение}) одним запросом"""
+        self._update_values(sheet_name, HEADERS[sheet_name].index(field) + 1, values)
 
-            # Secrets sheet
-            if 'Secrets' not in worksheets:
-                ws = self.sheet.add_worksheet(title='Secrets', rows=1000, cols=5)
-                ws.append_row(['ID', 'Name', 'Description', 'Created', 'Data'])
+    def mirror_delete(self, sheet_name, record_id):
+        """Удалить запись"""
+        self._delete(sheet_name, record_id)
+
+    def close(self):
+        """Записать отложенные изменения перед остановкой"""
+        if self.writer:
+            self.writer.stop()
+
+    def cache_stats(self):
+        """Статистика кэша записей"""
+        return self.cache.stats()
+
+    def _page(self, sheet_name, label, offset, limit):
+        """Страница записей: срез кэша или чтение только нужного диапазона строк"""
+        try:
+            records = self.cache.get(sheet_name)
+            if records is not None:
+                return records[offset:offset + limit], len(records)
+            if self.writer and self.writer.pending(sheet_name):
+                self.writer.flush(sheet_name)
+            self.connect()
+            headers = HEADERS[sheet_name]
+            first = offset + 2
+            last_cell = rowcol_to_a1(first + limit - 1, len(headers))
+            ranges = [f"'{sheet_name}'!A{first}:{last_cell}"]
+            counted = self._counts.get(sheet_name)
+            if counted is None or time.monotonic() - counted[0] > CACHE_TTL:
+                # Число записей неизвестно — тем же запросом читаем колонку ID
+                ranges.append(f"'{sheet_name}'!A2:A")
+            value_ranges = self._api(self._spreadsheet, 'values_batch_get', ranges).get('valueRanges', [])
+            records = [
+                dict(zip(headers, numericise_all(row[:1]) + row[1:] + [''] * (len(headers) - len(row))))
+                for row in value_ranges[0].get('values', [])
+            ]
+            if len(value_ranges) > 1:
+                self._counts[sheet_name] = (time.monotonic(), len(value_ranges[1].get('values', [])))
+            return records, self._counts[sheet_name][1]
         except Exception as e:
-            print(f"Ошибка инициализации таблиц: {e}")
+            report_error(label, f"Ошибка постраничного чтения {sheet_name}: {e}")
+            return [], 0
+
+    def get_projects_page(self, offset, limit):
+        return self._page(PROJECTS_SHEET, 'get_projects_page', offset, limit)
+
+    def get_tasks_page(self, offset, limit):
+        return self._page(TASKS_SHEET, 'get_tasks_page', offset, limit)
+
+    def get_notes_page(self, offset, limit):
+        return self._page(NOTES_SHEET, 'get_notes_page', offset, limit)
+
+    def get_secrets_page(self, offset, limit):
+        return self._page(SECRETS_SHEET, 'get_secrets_page', offset, limit)
 
     # PROJECTS
     def get_projects(self):
         try:
-            worksheet = self.sheet.worksheet('Projects')
-            records = worksheet.get_all_records()
-            return records
+            return self._get_records(PROJECTS_SHEET)
         except Exception as e:
-            print(f"Ошибка получения проектов: {e}")
+            report_error('get_projects', f"Ошибка получения проектов: {e}")
             return []
 
+    def get_project(self, project_id):
+        try:
+            found, record = self.cache.find(PROJECTS_SHEET, project_id)
+            if found:
+                return record
+            projects = self._get_records(PROJECTS_SHEET)
+            return next((r for r in projects if str(r['ID']) == str(project_id)), None)
+        except Exception as e:
+            report_error('get_project', f"Ошибка получения проекта: {e}")
+            return None
+
     def add_project(self, name, description=""):
         try:
-            worksheet = self.sheet.worksheet('Projects')
-            new_id = len(worksheet.get_all_records()) + 1
-            worksheet.append_row([
+            new_id = self.ids.next_id(PROJECTS_SHEET)
+            self._append(PROJECTS_SHEET, [
                 new_id,
                 name,
                 description,
@@ -64,39 +522,32 @@ class SheetsManager:
             ])
             return new_id
         except Exception as e:
-            print(f"Ошибка добавления проекта: {e}")
+            report_error('add_project', f"Ошибка добавления проекта: {e}")
             return None
 
     def delete_project(self, project_id):
         try:
-            worksheet = self.sheet.worksheet('Projects')
-            records = worksheet.get_all_records()
-            for i, record in enumerate(records, start=2):
-                if int(record['ID']) == int(project_id):
-                    worksheet.delete_rows(i)
-                    return True
-            return False
+            return self._delete(PROJECTS_SHEET, project_id)
         except Exception as e:
-            print(f"Ошибка удаления проекта: {e}")
+            report_error('delete_project', f"Ошибка удаления проекта: {e}")
+            self.cache.invalidate(PROJECTS_SHEET)
+            self.rows.invalidate(PROJECTS_SHEET)
             return False
 
     # TASKS
     def get_tasks(self, project_name=None):
         try:
-            worksheet = self.sheet.worksheet('Tasks')
-            records = worksheet.get_all_records()
             if project_name:
-                records = [r for r in records if r['Project'] == project_name]
-            return records
+                return self._lookup(TASKS_SHEET, 'Project', project_name)
+            return self._get_records(TASKS_SHEET)
         except Exception as e:
-            print(f"Ошибка получения задач: {e}")
+            report_error('get_tasks', f"Ошибка получения задач: {e}")
             return []
 
     def add_task(self, project, title, description="", priority="medium", deadline=""):
         try:
-            worksheet = self.sheet.worksheet('Tasks')
-            new_id = len(worksheet.get_all_records()) + 1
-            worksheet.append_row([
+            new_id = self.ids.next_id(TASKS_SHEET)
+            self._append(TASKS_SHEET, [
                 new_id,
                 project,
                 title,
@@ -108,39 +559,90 @@ class SheetsManager:
             ])
             return new_id
         except Exception as e:
-            print(f"Ошибка добавления задачи: {e}")
+            report_error('add_task', f"Ошибка добавления задачи: {e}")
             return None
 
+    def add_tasks(self, tasks):
+        try:
+            if not tasks:
+                return []
+            first = self.ids.next_ids(TASKS_SHEET, len(tasks))
+            created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            rows = [
+                [first + i, project, title, description, "todo", priority, deadline, created]
+                for i, (project, title, description, priority, deadline) in enumerate(tasks)
+            ]
+            self._append_rows(TASKS_SHEET, rows)
+            return [row[0] for row in rows]
+        except Exception as e:
+            report_error('add_tasks', f"Ошибка импорта задач: {e}")
+            return []
+
     def update_task_status(self, task_id, status):
         try:
-            worksheet = self.sheet.worksheet('Tasks')
-            records = worksheet.get_all_records()
-            for i, record in enumerate(records, start=2):
-                if int(record['ID']) == int(task_id):
-                    worksheet.update_cell(i, 5, status)  # Status column
-                    return True
-            return False
+            return self._update_cell(TASKS_SHEET, task_id, 5, status)  # Status column
         except Exception as e:
-            print(f"Ошибка обновления задачи: {e}")
+            report_error('update_task_status', f"Ошибка обновления задачи: {e}")
+            self.cache.invalidate(TASKS_SHEET)
+            self.rows.invalidate(TASKS_SHEET)
             return False
 
+    def update_tasks_status(self, task_ids, status):
+        try:
+            return self._update_cells(TASKS_SHEET, task_ids, 5, status)  # Status column
+        except Exception as e:
+            report_error('update_tasks_status', f"Ошибка обновления задач: {e}")
+            self.cache.invalidate(TASKS_SHEET)
+            self.rows.invalidate(TASKS_SHEET)
+            return []
+
+    # ARCHIVE
+    def archive_tasks(self, before):
+        try:
+            tasks = [t for t in self._get_records(TASKS_SHEET)
+                     if t['Status'] == 'done' and str(t['Created']) < before]
+            return len(self._move(TASKS_SHEET, ARCHIVE_SHEET, tasks))
+        except Exception as e:
+            report_error('archive_tasks', f"Ошибка переноса задач в архив: {e}")
+            for sheet_name in (TASKS_SHEET, ARCHIVE_SHEET):
+                self.cache.invalidate(sheet_name)
+                self.rows.invalidate(sheet_name)
+            return 0
+
+    def get_archived_tasks(self, project_name=None):
+        try:
+            if project_name:
+                return self._lookup(ARCHIVE_SHEET, 'Project', project_name)
+            return self._get_records(ARCHIVE_SHEET)
+        except Exception as e:
+            report_error('get_archived_tasks', f"Ошибка получения архива: {e}")
+            return []
+
+    def get_archived_task(self, task_id):
+        try:
+            found, record = self.cache.find(ARCHIVE_SHEET, task_id)
+            if found:
+                return record
+            tasks = self._get_records(ARCHIVE_SHEET)
+            return next((t for t in tasks if str(t['ID']) == str(task_id)), None)
+        except Exception as e:
+            report_error('get_archived_task', f"Ошибка получения задачи из архива: {e}")
+            return None
+
     # NOTES
     def get_notes(self, project_name=None):
         try:
-            worksheet = self.sheet.worksheet('Notes')
-            records = worksheet.get_all_records()
             if project_name:
-                records = [r for r in records if r['Project'] == project_name]
-            return records
+                return self._lookup(NOTES_SHEET, 'Project', project_name)
+            return self._get_records(NOTES_SHEET)
         except Exception as e:
-            print(f"Ошибка получения заметок: {e}")
+            report_error('get_notes', f"Ошибка получения заметок: {e}")
             return []
 
     def add_note(self, title, content, tags="", project=""):
         try:
-            worksheet = self.sheet.worksheet('Notes')
-            new_id = len(worksheet.get_all_records()) + 1
-            worksheet.append_row([
+            new_id = self.ids.next_id(NOTES_SHEET)
+            self._append(NOTES_SHEET, [
                 new_id,
                 title,
                 content,
@@ -150,31 +652,42 @@ class SheetsManager:
             ])
             return new_id
         except Exception as e:
-            print(f"Ошибка добавления заметки: {e}")
+            report_error('add_note', f"Ошибка добавления заметки: {e}")
             return None
 
     # SECRETS
     def get_secrets(self):
         try:
-            worksheet = self.sheet.worksheet('Secrets')
-            records = worksheet.get_all_records()
-            return records
+            return self._get_records(SECRETS_SHEET)
         except Exception as e:
-            print(f"Ошибка получения секретов: {e}")
+            report_error('get_secrets', f"Ошибка получения секретов: {e}")
             return []
 
     def add_secret(self, name, description="", data=""):
         try:
-            worksheet = self.sheet.worksheet('Secrets')
-            new_id = len(worksheet.get_all_records()) + 1
-            worksheet.append_row([
+            new_id = self.ids.next_id(SECRETS_SHEET)
+            self._append(SECRETS_SHEET, [
                 new_id,
                 name,
                 description,
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                data  # TODO: Добавить шифрование
+                encrypt(data)
             ])
             return new_id
         except Exception as e:
-            print(f"Ошибка добавления секрета: {e}")
-            return None
\ No newline at end of file
+            report_error('add_secret', f"Ошибка добавления секрета: {e}")
+            return None
+
+    def encrypt_secrets(self):
+        try:
+            if not encryption_enabled():
+                return 0
+            values = {s['ID']: encrypt(s['Data']) for s in self._get_records(SECRETS_SHEET)
+                      if s['Data'] != '' and not is_encrypted(s['Data'])}
+            col = HEADERS[SECRETS_SHEET].index('Data') + 1
+            self._update_values(SECRETS_SHEET, col, values)
+            return len(values)
+        except Exception as e:
+            report_error('encrypt_secrets', f"Ошибка шифрования секретов: {e}")
+            self.cache.invalidate(SECRETS_SHEET)
+            return 0
@@ -0,0 +1,111 @@
+import threading
+import time
+from config import MIRROR_RETRY_DELAY, MIRROR_DRAIN_TIMEOUT
+from metrics import report_error
+from rate_limiter import background
+
+
+class SheetsMirror:
+    """Фоновая синхронизация SQLite -> Google Sheets.
+
+    Изменения берутся по порядку из таблицы-очереди SQLiteStorage (outbox)
+    и применяются к SheetsManager. Пока Google Sheets недоступен или
+    упирается в квоты, очередь просто растет, а бот работает с SQLite.
+    """
+
+    def __init__(self, manager, retry_delay=MIRROR_RETRY_DELAY):
+        self.manager = manager
+        self.retry_delay = retry_delay
+        self.storage = None
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._deadline = None  # до какого момента дописывать очередь после stop()
+        self._thread = None
+
+    def start(self, storage):
+        """Начать синхронизацию очереди изменений хранилища"""
+        self.storage = storage
+        self._thread = threading.Thread(target=self._run, name='sheets-mirror', daemon=True)
+        self._thread.start()
+        # Изменения, не записанные до прошлой остановки
+        self._wakeup.set()
+
+    def notify(self):
+        """В очереди появились изменения"""
+        self._wakeup.set()
+
+    def _apply(self, op, sheet_name, payload):
+        if op == 'append':
+            self.manager.mirror_append(sheet_name, payload['row'])
+        elif op == 'append_rows':
+            self.manager.mirror_append_rows(sheet_name, payload['rows'])
+        elif op == 'update':
+            self.manager.mirror_update(sheet_name, payload['id'], payload['field'], payload['value'])
+        elif op == 'update_many':
+            self.manager.mirror_update_many(sheet_name, payload['ids'], payload['field'], payload['value'])
+        elif op == 'update_values':
+            self.manager.mirror_update_values(sheet_name, payload['field'], payload['values'])
+        elif op == 'archive':
+            self.manager.mirror_archive(payload['ids'])
+        elif op == 'delete':
+            self.manager.mirror_delete(sheet_name, payload['id'])
+
+    def _run(self):
+        # Синхронизация пропускает вперед запросы пользователей
+        with background():
+            self._sync_loop()
+
+    def _expired(self):
+        """Остановка запрошена и время на запись очереди вышло"""
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def _drain(self):
+        """Применить изменения из очереди по порядку, пока она не опустеет"""
+        while not self._expired():
+            batch = self.storage.outbox_batch()
+            if not batch:
+                return
+            for seq, op, sheet_name, payload in batch:
+                if self._expired():
+                    return
+                self._apply(op, sheet_name, payload)
+                self.storage.outbox_done(seq)
+
+    def _sync_loop(self):
+        delay = self.retry_delay
+        while True:
+            if not self._stopped:
+                self._wakeup.wait(delay if delay > self.retry_delay else None)
+                self._wakeup.clear()
+            try:
+                self._drain()
+                delay = self.retry_delay
+                if self._stopped:
+                    return
+            except Exception as e:
+                # Повторим позже с экспоненциальной задержкой
+                report_error('mirror', f"Ошибка синхронизации с Google Sheets: {e}")
+                delay = min(delay * 2, 300)
+                if self._stopped:
+                    # При остановке повторяем, пока не выйдет отведенное время
+                    if self._expired():
+                        return
+                    time.sleep(max(0.0, min(self.retry_delay, self._deadline - time.monotonic())))
+
+    def stop(self, timeout=MIRROR_DRAIN_TIMEOUT):
+        """Остановить синхронизацию, сначала дописав очередь (не дольше timeout секунд).
+
+        Что не успело записаться, остается в outbox до следующего запуска
+        с той же базой SQLite — на эфемерном диске это будет потеряно.
+        """
+        self._deadline = time.monotonic() + timeout
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread:
+            # Запрос к Google Sheets, начатый до срока, дожидаемся (с запасом на повторы)
+            self._thread.join(timeout + self.retry_delay)
+        left = self.storage.outbox_size() if self.storage else 0
+        if left:
+            report_error('mirror_shutdown', f"⚠️ Зеркало остановлено: {left} изменений не записаны в Google Sheets "
+                                            f"и остались только в SQLite (_mirror_outbox)")
+        self.manager.close()
@@ -0,0 +1,435 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from config import PROJECTS_SHEET, TASKS_SHEET, NOTES_SHEET, SECRETS_SHEET, ARCHIVE_SHEET
+from storage import Storage, HEADERS
+from metrics import report_error
+from secrets_crypto import encrypt, is_encrypted, encryption_enabled
+
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS {PROJECTS_SHEET} (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT, Description TEXT, Created TEXT, Status TEXT
+);
+CREATE TABLE IF NOT EXISTS {TASKS_SHEET} (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Project TEXT, Title TEXT, Description TEXT, Status TEXT,
+    Priority TEXT, Deadline TEXT, Created TEXT
+);
+CREATE TABLE IF NOT EXISTS {NOTES_SHEET} (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Title TEXT, Content TEXT, Tags TEXT, Created TEXT, Project TEXT
+);
+CREATE TABLE IF NOT EXISTS {SECRETS_SHEET} (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT, Description TEXT, Created TEXT, Data TEXT
+);
+-- Архив выполненных задач: ID сохраняются из Tasks
+CREATE TABLE IF NOT EXISTS {ARCHIVE_SHEET} (
+    ID INTEGER PRIMARY KEY,
+    Project TEXT, Title TEXT, Description TEXT, Status TEXT,
+    Priority TEXT, Deadline TEXT, Created TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_projects_name ON {PROJECTS_SHEET}(Name);
+CREATE INDEX IF NOT EXISTS idx_tasks_project ON {TASKS_SHEET}(Project);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON {TASKS_SHEET}(Status);
+CREATE INDEX IF NOT EXISTS idx_tasks_deadline ON {TASKS_SHEET}(Deadline);
+CREATE INDEX IF NOT EXISTS idx_notes_project ON {NOTES_SHEET}(Project);
+CREATE INDEX IF NOT EXISTS idx_archive_project ON {ARCHIVE_SHEET}(Project);
+
+-- Очередь изменений для зеркала в Google Sheets
+CREATE TABLE IF NOT EXISTS _mirror_outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL, sheet TEXT NOT NULL, payload TEXT NOT NULL
+);
+'''
+
+
+class SQLiteStorage(Storage):
+    """Основное хранилище в локальной SQLite.
+
+    Чтения и записи выполняются локально. Если задано зеркало, каждое
+    изменение в той же транзакции попадает в очередь _mirror_outbox,
+    откуда SheetsMirror переносит его в Google Sheets. При первом запуске
+    с пустой базой данные импортируются из таблицы.
+    """
+
+    def __init__(self, path, mirror=None):
+        super().__init__()
+        self.path = path
+        self.mirror = mirror
+        self._db = None
+        self._lock = threading.RLock()
+
+    def connect(self):
+        with self._lock:
+            if self._db is not None:
+                return
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+            if self.mirror:
+                try:
+                    self._import_from_sheets(db)
+                except Exception:
+                    db.close()
+                    raise
+            self._db = db
+        if self.mirror:
+            self.mirror.start(self)
+
+    def _import_from_sheets(self, db):
+        """Заполнить пустую базу данными из Google Sheets"""
+        if any(db.execute(f'SELECT 1 FROM {name} LIMIT 1').fetchone() for name in HEADERS):
+            return
+        manager = self.mirror.manager
+        manager.connect()
+        with db:
+            for name, headers in HEADERS.items():
+                rows = [
+                    [int(r['ID'])] + [str(r.get(h, '')) for h in headers[1:]]
+                    for r in manager.load_records(name) if str(r.get('ID', '')).strip().isdigit()
+                ]
+                db.executemany(
+                    f'INSERT OR REPLACE INTO {name} ({", ".join(headers)}) VALUES ({", ".join("?" * len(headers))})',
+                    rows
+                )
+                # Не выдавать ID, уже использованные в таблице (в том числе удаленные)
+                last_id = max([row[0] for row in rows] + [manager.ids.last_id(name)])
+                db.execute('DELETE FROM sqlite_sequence WHERE name = ?', (name,))
+                db.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (name, last_id))
+
+    def close(self):
+        if self.mirror:
+            self.mirror.stop()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def cache_stats(self):
+        if not self.mirror:
+            return {}
+        stats = dict(self.mirror.manager.cache_stats())
+        stats['mirror_pending'] = self.outbox_size()
+        return stats
+
+    # Внутренние операции
+    def _select(self, sql, params=()):
+        self.connect()
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params).fetchall()]
+
+    def _outbox(self, db, op, sheet_name, payload):
+        if self.mirror:
+            db.execute(
+                'INSERT INTO _mirror_outbox (op, sheet, payload) VALUES (?, ?, ?)',
+                (op, sheet_name, json.dumps(payload, ensure_ascii=False))
+            )
+
+    def _insert(self, sheet_name, values):
+        """Вставить запись (без ID), вернуть новый ID"""
+        self.connect()
+        headers = HEADERS[sheet_name]
+        with self._lock, self._writing(sheet_name), self._db as db:
+            cursor = db.execute(
+                f'INSERT INTO {sheet_name} ({", ".join(headers[1:])}) VALUES ({", ".join("?" * len(values))})',
+                values
+            )
+            new_id = cursor.lastrowid
+            self._outbox(db, 'append', sheet_name, {'row': [new_id] + list(values)})
+        if self.mirror:
+            self.mirror.notify()
+        return new_id
+
+    def _insert_many(self, sheet_name, rows):
+        """Вставить записи (без ID) одной транзакцией, вернуть новые ID"""
+        self.connect()
+        headers = HEADERS[sheet_name]
+        sql = f'INSERT INTO {sheet_name} ({", ".join(headers[1:])}) VALUES ({", ".join("?" * len(headers[1:]))})'
+        with self._lock, self._writing(sheet_name), self._db as db:
+            ids = [db.execute(sql, values).lastrowid for values in rows]
+            self._outbox(db, 'append_rows', sheet_name,
+                         {'rows': [[new_id] + list(values) for new_id, values in zip(ids, rows)]})
+        if self.mirror:
+            self.mirror.notify()
+        return ids
+
+    def _update(self, sheet_name, record_id, field, value):
+        self.connect()
+        with self._lock, self._writing(sheet_name), self._db as db:
+            cursor = db.execute(f'UPDATE {sheet_name} SET {field} = ? WHERE ID = ?', (value, int(record_id)))
+            if cursor.rowcount == 0:
+                return False
+            self._outbox(db, 'update', sheet_name, {'id': int(record_id), 'field': field, 'value': value})
+        if self.mirror:
+            self.mirror.notify()
+        return True
+
+    def _update_many(self, sheet_name, record_ids, field, value):
+        """Изменить поле нескольких записей в одной транзакции. ID найденных записей"""
+        self.connect()
+        updated = []
+        with self._lock, self._writing(sheet_name), self._db as db:
+            for record_id in dict.fromkeys(record_ids):
+                cursor = db.execute(f'UPDATE {sheet_name} SET {field} = ? WHERE ID = ?', (value, int(record_id)))
+                if cursor.rowcount:
+                    updated.append(record_id)
+            if updated:
+                self._outbox(db, 'update_many', sheet_name,
+                             {'ids': [int(record_id) for record_id in updated], 'field': field, 'value': value})
+        if updated and self.mirror:
+            self.mirror.notify()
+        return updated
+
+    def _update_values(self, sheet_name, field, values):
+        """Записать в поле разные значения ({ID: значение}) в одной транзакции. ID найденных записей"""
+        self.connect()
+        updated = []
+        with self._lock, self._writing(sheet_name), self._db as db:
+            for record_id, value in values.items():
+                cursor = db.execute(f'UPDATE {sheet_name} SET {field} = ? WHERE ID = ?', (value, int(record_id)))
+                if cursor.rowcount:
+                    updated.append(record_id)
+            if updated:
+                self._outbox(db, 'update_values', sheet_name,
+                             {'field': field, 'values': {int(record_id): values[record_id] for record_id in updated}})
+        if updated and self.mirror:
+            self.mirror.notify()
+        return updated
+
+    def _delete(self, sheet_name, record_id):
+        self.connect()
+        with self._lock, self._writing(sheet_name), self._db as db:
+            cursor = db.execute(f'DELETE FROM {sheet_name} WHERE ID = ?', (int(record_id),))
+            if cursor.rowcount == 0:
+                return False
+            self._outbox(db, 'delete', sheet_name, {'id': int(record_id)})
+        if self.mirror:
+            self.mirror.notify()
+        return True
+
+    # Очередь зеркала
+    def outbox_batch(self, limit=100):
+        """Первые изменения из очереди: [(seq, op, лист, данные)]"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT seq, op, sheet, payload FROM _mirror_outbox ORDER BY seq LIMIT ?', (limit,)
+            ).fetchall()
+        return [(row['seq'], row['op'], row['sheet'], json.loads(row['payload'])) for row in rows]
+
+    def outbox_done(self, seq):
+        """Изменение перенесено в Google Sheets"""
+        with self._lock, self._db as db:
+            db.execute('DELETE FROM _mirror_outbox WHERE seq = ?', (seq,))
+
+    def load_records(self, sheet_name):
+        return self._select(f'SELECT * FROM {sheet_name} ORDER BY ID')
+
+    def outbox_size(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM _mirror_outbox').fetchone()[0] if self._db else 0
+
+    def _page(self, sheet_name, label, offset, limit):
+        """Страница записей таблицы по ID"""
+        try:
+            records = self._select(f'SELECT * FROM {sheet_name} ORDER BY ID LIMIT ? OFFSET ?', (limit, offset))
+            total = self._select(f'SELECT COUNT(*) AS n FROM {sheet_name}')[0]['n']
+            return records, total
+        except Exception as e:
+            report_error(label, f"Ошибка постраничного чтения {sheet_name}: {e}")
+            return [], 0
+
+    def get_projects_page(self, offset, limit):
+        return self._page(PROJECTS_SHEET, 'get_projects_page', offset, limit)
+
+    def get_tasks_page(self, offset, limit):
+        return self._page(TASKS_SHEET, 'get_tasks_page', offset, limit)
+
+    def get_notes_page(self, offset, limit):
+        return self._page(NOTES_SHEET, 'get_notes_page', offset, limit)
+
+    def get_secrets_page(self, offset, limit):
+        return self._page(SECRETS_SHEET, 'get_secrets_page', offset, limit)
+
+    # PROJECTS
+    def get_projects(self):
+        try:
+            return self._select(f'SELECT * FROM {PROJECTS_SHEET} ORDER BY ID')
+        except Exception as e:
+            report_error('get_projects', f"Ошибка получения проектов: {e}")
+            return []
+
+    def get_project(self, project_id):
+        try:
+            rows = self._select(f'SELECT * FROM {PROJECTS_SHEET} WHERE ID = ?', (project_id,))
+            return rows[0] if rows else None
+        except Exception as e:
+            report_error('get_project', f"Ошибка получения проекта: {e}")
+            return None
+
+    def add_project(self, name, description=""):
+        try:
+            return self._insert(PROJECTS_SHEET, [
+                name,
+                description,
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'active'
+            ])
+        except Exception as e:
+            report_error('add_project', f"Ошибка добавления проекта: {e}")
+            return None
+
+    def delete_project(self, project_id):
+        try:
+            return self._delete(PROJECTS_SHEET, project_id)
+        except Exception as e:
+            report_error('delete_project', f"Ошибка удаления проекта: {e}")
+            return False
+
+    # TASKS
+    def get_tasks(self, project_name=None):
+        try:
+            if project_name:
+                return self._select(f'SELECT * FROM {TASKS_SHEET} WHERE Project = ? ORDER BY ID', (project_name,))
+            return self._select(f'SELECT * FROM {TASKS_SHEET} ORDER BY ID')
+        except Exception as e:
+            report_error('get_tasks', f"Ошибка получения задач: {e}")
+            return []
+
+    def add_task(self, project, title, description="", priority="medium", deadline=""):
+        try:
+            return self._insert(TASKS_SHEET, [
+                project,
+                title,
+                description,
+                "todo",
+                priority,
+                deadline,
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            ])
+        except Exception as e:
+            report_error('add_task', f"Ошибка добавления задачи: {e}")
+            return None
+
+    def add_tasks(self, tasks):
+        try:
+            if not tasks:
+                return []
+            created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            return self._insert_many(TASKS_SHEET, [
+                [project, title, description, "todo", priority, deadline, created]
+                for project, title, description, priority, deadline in tasks
+            ])
+        except Exception as e:
+            report_error('add_tasks', f"Ошибка импорта задач: {e}")
+            return []
+
+    def update_task_status(self, task_id, status):
+        try:
+            return self._update(TASKS_SHEET, task_id, 'Status', status)
+        except Exception as e:
+            report_error('update_task_status', f"Ошибка обновления задачи: {e}")
+            return False
+
+    def update_tasks_status(self, task_ids, status):
+        try:
+            return self._update_many(TASKS_SHEET, task_ids, 'Status', status)
+        except Exception as e:
+            report_error('update_tasks_status', f"Ошибка обновления задач: {e}")
+            return []
+
+    # ARCHIVE
+    def archive_tasks(self, before):
+        try:
+            self.connect()
+            columns = ", ".join(HEADERS[TASKS_SHEET])
+            where = "Status = 'done' AND Created < ?"
+            with self._lock, self._writing(TASKS_SHEET), self._writing(ARCHIVE_SHEET), self._db as db:
+                ids = [row[0] for row in db.execute(f'SELECT ID FROM {TASKS_SHEET} WHERE {where} ORDER BY ID', (before,))]
+                if not ids:
+                    return 0
+                db.execute(f'INSERT OR REPLACE INTO {ARCHIVE_SHEET} ({columns}) '
+                           f'SELECT {columns} FROM {TASKS_SHEET} WHERE {where}', (before,))
+                db.execute(f'DELETE FROM {TASKS_SHEET} WHERE {where}', (before,))
+                self._outbox(db, 'archive', TASKS_SHEET, {'ids': ids})
+            if self.mirror:
+                self.mirror.notify()
+            return len(ids)
+        except Exception as e:
+            report_error('archive_tasks', f"Ошибка переноса задач в архив: {e}")
+            return 0
+
+    def get_archived_tasks(self, project_name=None):
+        try:
+            if project_name:
+                return self._select(f'SELECT * FROM {ARCHIVE_SHEET} WHERE Project = ? ORDER BY ID', (project_name,))
+            return self._select(f'SELECT * FROM {ARCHIVE_SHEET} ORDER BY ID')
+        except Exception as e:
+            report_error('get_archived_tasks', f"Ошибка получения архива: {e}")
+            return []
+
+    def get_archived_task(self, task_id):
+        try:
+            rows = self._select(f'SELECT * FROM {ARCHIVE_SHEET} WHERE ID = ?', (int(task_id),))
+            return rows[0] if rows else None
+        except Exception as e:
+            report_error('get_archived_task', f"Ошибка получения задачи из архива: {e}")
+            return None
+
+    # NOTES
+    def get_notes(self, project_name=None):
+        try:
+            if project_name:
+                return self._select(f'SELECT * FROM {NOTES_SHEET} WHERE Project = ? ORDER BY ID', (project_name,))
+            return self._select(f'SELECT * FROM {NOTES_SHEET} ORDER BY ID')
+        except Exception as e:
+            report_error('get_notes', f"Ошибка получения заметок: {e}")
+            return []
+
+    def add_note(self, title, content, tags="", project=""):
+        try:
+            return self._insert(NOTES_SHEET, [
+                title,
+                content,
+                tags,
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                project
+            ])
+        except Exception as e:
+            report_error('add_note', f"Ошибка добавления заметки: {e}")
+            return None
+
+    # SECRETS
+    def get_secrets(self):
+        try:
+            return self._select(f'SELECT * FROM {SECRETS_SHEET} ORDER BY ID')
+        except Exception as e:
+            report_error('get_secrets', f"Ошибка получения секретов: {e}")
+            return []
+
+    def add_secret(self, name, description="", data=""):
+        try:
+            return self._insert(SECRETS_SHEET, [
+                name,
+                description,
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                encrypt(data)
+            ])
+        except Exception as e:
+            report_error('add_secret', f"Ошибка добавления секрета: {e}")
+            return None
+
+    def encrypt_secrets(self):
+        try:
+            if not encryption_enabled():
+                return 0
+            values = {s['ID']: encrypt(s['Data']) for s in self._select(f'SELECT ID, Data FROM {SECRETS_SHEET}')
+                      if s['Data'] and not is_encrypted(s['Data'])}
+            return len(self._update_values(SECRETS_SHEET, 'Data', values)) if values else 0
+        except Exception as e:
+            report_error('encrypt_secrets', f"Ошибка шифрования секретов: {e}")
+            return 0
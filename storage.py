@@ -0,0 +1,147 @@
+import contextlib
+from config import PROJECTS_SHEET, TASKS_SHEET, NOTES_SHEET, SECRETS_SHEET, ARCHIVE_SHEET
+
+
+# Заголовки листов (и колонки таблиц SQLite)
+HEADERS = {
+    PROJECTS_SHEET: ['ID', 'Name', 'Description', 'Created', 'Status'],
+    TASKS_SHEET: ['ID', 'Project', 'Title', 'Description', 'Status', 'Priority', 'Deadline', 'Created'],
+    NOTES_SHEET: ['ID', 'Title', 'Content', 'Tags', 'Created', 'Project'],
+    SECRETS_SHEET: ['ID', 'Name', 'Description', 'Created', 'Data'],
+    ARCHIVE_SHEET: ['ID', 'Project', 'Title', 'Description', 'Status', 'Priority', 'Deadline', 'Created'],
+}
+
+
+def _slice(records, offset, limit):
+    return records[offset:offset + limit], len(records)
+
+
+class Storage:
+    """Интерфейс хранилища проектов, задач, заметок и секретов.
+
+    Записи возвращаются как словари с ключами из HEADERS. Методы не бросают
+    исключений: при ошибке чтения возвращается [], при ошибке записи — None/False.
+    """
+
+    def __init__(self):
+        self._versions = {}  # лист -> номер версии данных
+
+    def data_version(self, sheet_name):
+        """Версия данных листа: меняется при каждой записи через хранилище"""
+        return self._versions.get(sheet_name, 0)
+
+    def _changed(self, sheet_name):
+        self._versions[sheet_name] = self._versions.get(sheet_name, 0) + 1
+
+    @contextlib.contextmanager
+    def _writing(self, sheet_name):
+        """Запись в лист: версия меняется после нее (и после правки кэша), даже неудачной.
+
+        Экраны и индексы читают версию до данных: если поднять ее до записи,
+        построенное по старым данным сохранится под новой версией.
+        """
+        try:
+            yield
+        finally:
+            self._changed(sheet_name)
+
+    def connect(self):
+        """Подготовить хранилище (повторные вызовы ничего не делают)"""
+
+    def close(self):
+        """Завершить работу, записав отложенные изменения"""
+
+    def cache_stats(self):
+        """Статистика кэшей и очередей хранилища"""
+        return {}
+
+    def load_records(self, sheet_name):
+        """Все записи листа; в отличие от get_*, ошибка чтения пробрасывается"""
+        raise NotImplementedError
+
+    # Постраничное чтение: (записи страницы, всего записей).
+    # По умолчанию — срез полного списка, хранилища переопределяют
+    # их, чтобы читать только нужные строки.
+    def get_projects_page(self, offset, limit):
+        return _slice(self.get_projects(), offset, limit)
+
+    def get_tasks_page(self, offset, limit):
+        return _slice(self.get_tasks(), offset, limit)
+
+    def get_notes_page(self, offset, limit):
+        return _slice(self.get_notes(), offset, limit)
+
+    def get_secrets_page(self, offset, limit):
+        return _slice(self.get_secrets(), offset, limit)
+
+    # PROJECTS
+    def get_projects(self):
+        raise NotImplementedError
+
+    def get_project(self, project_id):
+        """Проект по ID или None"""
+        return next((p for p in self.get_projects() if str(p['ID']) == str(project_id)), None)
+
+    def add_project(self, name, description=""):
+        raise NotImplementedError
+
+    def delete_project(self, project_id):
+        raise NotImplementedError
+
+    # TASKS
+    def get_tasks(self, project_name=None):
+        raise NotImplementedError
+
+    def add_task(self, project, title, description="", priority="medium", deadline=""):
+        raise NotImplementedError
+
+    def add_tasks(self, tasks):
+        """Добавить задачи [(project, title, description, priority, deadline)].
+
+        Возвращает ID в том же порядке (None — задача не добавлена); хранилища
+        переопределяют метод, чтобы записать все задачи одним запросом.
+        """
+        return [self.add_task(*task) for task in tasks]
+
+    def update_task_status(self, task_id, status):
+        raise NotImplementedError
+
+    def update_tasks_status(self, task_ids, status):
+        """Установить статус нескольким задачам.
+
+        Возвращает ID найденных задач; хранилища переопределяют метод,
+        чтобы записать все изменения одним запросом.
+        """
+        return [task_id for task_id in dict.fromkeys(task_ids) if self.update_task_status(task_id, status)]
+
+    # ARCHIVE
+    def archive_tasks(self, before):
+        """Перенести в архив выполненные задачи, созданные раньше before (YYYY-MM-DD). Число перенесенных"""
+        raise NotImplementedError
+
+    def get_archived_tasks(self, project_name=None):
+        raise NotImplementedError
+
+    def get_archived_task(self, task_id):
+        raise NotImplementedError
+
+    # NOTES
+    def get_notes(self, project_name=None):
+        raise NotImplementedError
+
+    def add_note(self, title, content, tags="", project=""):
+        raise NotImplementedError
+
+    # SECRETS
+    def get_secrets(self):
+        raise NotImplementedError
+
+    def add_secret(self, name, description="", data=""):
+        raise NotImplementedError
+
+    def encrypt_secrets(self):
+        """Зашифровать записи Secrets, сохраненные без шифрования (одной пакетной записью).
+
+        Возвращает число зашифрованных записей; без SECRETS_KEY ничего не делает.
+        """
+        raise NotImplementedError
@@ -0,0 +1,105 @@
+import csv
+import io
+from config import IMPORT_MAX_TASKS
+
+
+PRIORITIES = ('high', 'medium', 'low')
+
+# Названия колонок CSV (в нижнем регистре) -> поле задачи
+COLUMNS = {
+    'project': 'project', 'проект': 'project',
+    'title': 'title', 'название': 'title', 'задача': 'title',
+    'description': 'description', 'описание': 'description',
+    'priority': 'priority', 'приоритет': 'priority',
+    'deadline': 'deadline', 'дедлайн': 'deadline', 'срок': 'deadline',
+}
+# Порядок колонок CSV без заголовка — как в ручном вводе задачи
+POSITIONAL = ('title', 'description', 'priority', 'deadline', 'project')
+# Типы, с которыми Telegram присылает CSV (зависит от клиента и ОС)
+CSV_MIME_TYPES = ('text/csv', 'text/plain', 'text/comma-separated-values', 'application/csv')
+
+
+class CSVFormatError(ValueError):
+    """Файл не является CSV-текстом в UTF-8"""
+
+
+def is_csv(file_name, mime_type):
+    """Похож ли документ на CSV: по расширению или MIME-типу (xlsx и прочие архивы — нет)"""
+    return (file_name or '').lower().endswith('.csv') or mime_type in CSV_MIME_TYPES
+
+
+def _task(fields, default_project):
+    """Кортеж для Storage.add_tasks или None, если нет названия"""
+    title = (fields.get('title') or '').strip()
+    if not title:
+        return None
+    priority = (fields.get('priority') or '').strip().lower()
+    return (
+        (fields.get('project') or '').strip() or default_project,
+        title,
+        (fields.get('description') or '').strip(),
+        priority if priority in PRIORITIES else 'medium',
+        (fields.get('deadline') or '').strip(),
+    )
+
+
+def parse_blocks(text, default_project):
+    """Задачи из текста: блоки через пустую строку, строки блока — как в ручном вводе"""
+    block = []
+    for line in text.split('\n') + ['']:
+        if line.strip():
+            block.append(line)
+            continue
+        if block:
+            task = _task(dict(zip(POSITIONAL[:4], block)), default_project)
+            if task:
+                yield task
+            block = []
+
+
+def parse_csv(stream, default_project):
+    """Задачи из CSV (файловый объект в байтах), построчно, без чтения файла целиком в список.
+
+    Недопустимый UTF-8 или двоичные данные — CSVFormatError: импорт
+    целиком отменяется, а не превращает мусор в задачи.
+    """
+    try:
+        yield from _parse_csv(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''), default_project)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise CSVFormatError(str(e)) from e
+
+
+def _parse_csv(text, default_project):
+    # Разделитель — самый частый из , ; и табуляции в первой строке (Excel в русской локали пишет ;)
+    header = text.readline()
+    if '\x00' in header:
+        raise CSVFormatError("двоичный файл")
+    delimiter = max(',;\t', key=header.count)
+    text.seek(0)
+
+    reader = csv.reader(text, delimiter=delimiter)
+    first = next(reader, None)
+    if first is None:
+        return
+    names = [COLUMNS.get(cell.strip().lower()) for cell in first]
+    if 'title' in names:
+        columns = names
+    else:
+        columns = POSITIONAL
+        task = _task(dict(zip(columns, first)), default_project)
+        if task:
+            yield task
+    for row in reader:
+        task = _task({name: value for name, value in zip(columns, row) if name}, default_project)
+        if task:
+            yield task
+
+
+def collect(tasks, limit=IMPORT_MAX_TASKS):
+    """Не больше limit задач: (список, были ли лишние)"""
+    result = []
+    for task in tasks:
+        if len(result) == limit:
+            return result, True
+        result.append(task)
+    return result, False
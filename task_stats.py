@@ -0,0 +1,86 @@
+import bisect
+from collections import Counter
+from reminders import parse_deadline
+
+
+class ProjectStats:
+    """Счетчики задач одного проекта"""
+
+    __slots__ = ('statuses', 'priorities', 'deadlines')
+
+    def __init__(self):
+        self.statuses = Counter()  # статус -> задач
+        self.priorities = Counter()  # приоритет -> невыполненных задач
+        self.deadlines = []  # отсортированные дедлайны невыполненных задач (YYYY-MM-DD)
+
+    @property
+    def total(self):
+        return sum(self.statuses.values())
+
+    def overdue(self, today):
+        """Невыполненных задач с дедлайном раньше today (строка YYYY-MM-DD)"""
+        return bisect.bisect_left(self.deadlines, today)
+
+
+class TaskStats:
+    """Счетчики задач по проектам: статусы, приоритеты, просроченные.
+
+    Строятся по листу задач один раз и дальше обновляются событиями
+    хранилища (как очередь напоминаний), поэтому сводка стоит O(проектов)
+    независимо от числа задач.
+    """
+
+    def __init__(self, tasks=()):
+        self.projects = {}  # название проекта -> ProjectStats
+        self._tasks = {}  # str(ID) -> (проект, статус, приоритет, дедлайн)
+        for task in tasks:
+            self.add(task)
+
+    def _count(self, key, sign):
+        project, status, priority, deadline = key
+        stats = self.projects.get(project)
+        if stats is None:
+            stats = self.projects[project] = ProjectStats()
+        stats.statuses[status] += sign
+        if status == 'done':
+            return
+        stats.priorities[priority] += sign
+        if deadline:
+            if sign > 0:
+                bisect.insort(stats.deadlines, deadline)
+            else:
+                del stats.deadlines[bisect.bisect_left(stats.deadlines, deadline)]
+
+    def add(self, task):
+        """Новая задача (или замена задачи с тем же ID)"""
+        task_id = str(task['ID'])
+        if task_id in self._tasks:
+            self._count(self._tasks[task_id], -1)
+        deadline = task.get('Deadline', '')
+        key = (
+            task['Project'],
+            task['Status'],
+            task['Priority'],
+            str(deadline).strip() if parse_deadline(deadline) else '',
+        )
+        self._tasks[task_id] = key
+        self._count(key, 1)
+
+    def status_changed(self, task_id, status):
+        key = self._tasks.get(str(task_id))
+        if key is None or key[1] == status:
+            return
+        self._count(key, -1)
+        key = self._tasks[str(task_id)] = (key[0], status, key[2], key[3])
+        self._count(key, 1)
+
+    def on_change(self, event, record):
+        """Событие хранилища: 'task_added' (запись задачи) или 'task_status' (ID и Status)"""
+        if event == 'task_added':
+            self.add(record)
+        elif event == 'task_status':
+            self.status_changed(record['ID'], record['Status'])
+
+    def project(self, name):
+        """ProjectStats проекта (пустые, если задач нет)"""
+        return self.projects.get(name) or ProjectStats()
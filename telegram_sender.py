@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from telegram.error import BadRequest, RetryAfter
+from config import (TELEGRAM_GLOBAL_PER_SEC, TELEGRAM_CHAT_PER_SEC, TELEGRAM_CHAT_BURST,
+                    TELEGRAM_GROUP_PER_MIN)
+from metrics import METRICS
+
+
+# Сколько последних сообщений и чатов помнить
+MAX_TRACKED = 10000
+
+
+class AsyncTokenBucket:
+    """Ведро токенов для event loop: ожидающие обслуживаются по очереди"""
+
+    def __init__(self, per_second, burst):
+        self.rate = per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        # Блокировка создается лениво, внутри работающего event loop
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def _digest(text, reply_markup):
+    """Отпечаток содержимого сообщения: текст (как его хранит Telegram) и кнопки"""
+    data = text.strip() + '\0' + (reply_markup.to_json() if reply_markup else '')
+    return hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+
+class MessageSender:
+    """Отправка и редактирование сообщений бота.
+
+    Запоминает отпечаток последнего показанного содержимого каждого сообщения
+    и не редактирует его, если содержимое не изменилось: Telegram все равно
+    ответит «message is not modified». Вызовы ограничены по частоте для чата
+    (в группах — по минутной квоте) и глобально; при превышении запросы ждут
+    очереди, а RetryAfter от Telegram выжидается и запрос повторяется.
+    """
+
+    def __init__(self, global_per_sec=TELEGRAM_GLOBAL_PER_SEC, chat_per_sec=TELEGRAM_CHAT_PER_SEC,
+                 chat_burst=TELEGRAM_CHAT_BURST, group_per_min=TELEGRAM_GROUP_PER_MIN):
+        self.chat_per_sec = chat_per_sec
+        self.chat_burst = chat_burst
+        self.group_per_min = group_per_min
+        self._global = AsyncTokenBucket(global_per_sec, global_per_sec)
+        self._chats = OrderedDict()  # chat_id -> AsyncTokenBucket
+        self._shown = OrderedDict()  # (chat_id, message_id) -> отпечаток содержимого
+        self._answered = OrderedDict()  # id callback-запросов, на которые уже ответили
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if chat_id < 0:  # группы и каналы
+                bucket = AsyncTokenBucket(self.group_per_min / 60.0, self.chat_burst)
+            else:
+                bucket = AsyncTokenBucket(self.chat_per_sec, self.chat_burst)
+            self._chats[chat_id] = bucket
+            if len(self._chats) > MAX_TRACKED:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    def _remember(self, message, digest):
+        key = (message.chat_id, message.message_id)
+        self._shown[key] = digest
+        self._shown.move_to_end(key)
+        if len(self._shown) > MAX_TRACKED:
+            self._shown.popitem(last=False)
+
+    async def _call(self, label, chat_id, method, *args, **kwargs):
+        """Вызов Bot API с учетом ограничений частоты"""
+        started = time.perf_counter()
+        await self._chat_bucket(chat_id).acquire()
+        await self._global.acquire()
+        METRICS.observe('telegram_rate_wait', label, (time.perf_counter() - started) * 1000)
+        while True:
+            try:
+                with METRICS.timer('telegram_call', label):
+                    return await method(*args, **kwargs)
+            except RetryAfter as e:
+                METRICS.inc('telegram_retry_after_total', label)
+                retry_after = e.retry_after
+                if hasattr(retry_after, 'total_seconds'):
+                    retry_after = retry_after.total_seconds()
+                await asyncio.sleep(retry_after)
+
+    async def reply(self, message, text, reply_markup=None):
+        """Новое сообщение в чат message"""
+        sent = await self._call('send', message.chat_id, message.reply_text, text, reply_markup=reply_markup)
+        self._remember(sent, _digest(text, reply_markup))
+        return sent
+
+    async def edit(self, message, text, reply_markup=None):
+        """Заменить содержимое message; если изменить нельзя — отправить новое сообщение"""
+        digest = _digest(text, reply_markup)
+        key = (message.chat_id, message.message_id)
+        known = self._shown.get(key)
+        if known is None and message.text is not None:
+            # Текущее содержимое пришло вместе с callback-запросом
+            known = _digest(message.text, message.reply_markup)
+        if known == digest:
+            METRICS.inc('telegram_skipped_edits_total')
+            return message
+        try:
+            edited = await self._call('edit', message.chat_id, message.edit_text, text, reply_markup=reply_markup)
+        except BadRequest as e:
+            if 'not modified' in str(e):
+                self._remember(message, digest)
+                return message
+            # Сообщение нельзя изменить (слишком старое, не текст и т.п.)
+            return await self.reply(message, text, reply_markup)
+        self._remember(message, digest)
+        return edited
+
+    async def send(self, bot, chat_id, text, reply_markup=None):
+        """Сообщение в чат по его ID (не в ответ на обновление)"""
+        sent = await self._call('send', chat_id, bot.send_message, chat_id, text, reply_markup=reply_markup)
+        self._remember(sent, _digest(text, reply_markup))
+        return sent
+
+    async def show(self, update, text, reply_markup=None):
+        """Показать экран: по кнопке — на месте ее сообщения, иначе — ответом"""
+        if update.callback_query:
+            return await self.edit(update.callback_query.message, text, reply_markup)
+        return await self.reply(update.effective_message, text, reply_markup)
+
+    async def answer(self, query, text=None):
+        """Ответить на callback-запрос (повторные ответы на тот же запрос не отправляются)"""
+        if query.id in self._answered:
+            return
+        self._answered[query.id] = True
+        if len(self._answered) > MAX_TRACKED:
+            self._answered.popitem(last=False)
+        try:
+            await query.answer(text)
+        except BadRequest:
+            # Запрос устарел — Telegram уже убрал индикатор загрузки сам
+            pass
+
+
+SENDER = MessageSender()
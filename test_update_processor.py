@@ -0,0 +1,34 @@
+"""ChatOrderedUpdateProcessor: параллельность между чатами и порядок внутри чата.
+
+Запуск: python -m pytest -q test_update_processor.py
+"""
+import asyncio
+from benchmarks import _process_updates
+
+PER_USER = 5
+LATENCY = 0.05  # секунд на обработку одного обновления
+LIMIT = 5  # одновременно обрабатываемых обновлений
+
+
+def _throughput(users):
+    elapsed, ordered = asyncio.run(_process_updates(users, PER_USER, LATENCY, LIMIT))
+    return users * PER_USER / elapsed, ordered
+
+
+def test_updates_of_each_chat_are_processed_in_order():
+    # Ранние обновления медленнее поздних: без очереди по чату порядок нарушится
+    _, ordered = asyncio.run(_process_updates(5, PER_USER, LATENCY, LIMIT, decreasing=True))
+    assert ordered
+
+
+def test_one_chat_is_not_parallelised():
+    throughput, ordered = _throughput(1)
+    assert ordered
+    assert throughput <= 1.2 / LATENCY
+
+
+def test_five_chats_get_five_times_the_throughput():
+    single, _ = _throughput(1)
+    five, ordered = _throughput(5)
+    assert ordered
+    assert five >= 4 * single
@@ -0,0 +1,63 @@
+import asyncio
+import time
+from telegram.ext import BaseUpdateProcessor
+from config import MAX_CONCURRENT_UPDATES, MAX_PENDING_UPDATES
+from metrics import METRICS
+
+
+def chat_key(update):
+    """Ключ очереди обновления: чат, иначе пользователь, иначе None"""
+    chat = getattr(update, 'effective_chat', None)
+    if chat is not None:
+        return ('chat', chat.id)
+    user = getattr(update, 'effective_user', None)
+    if user is not None:
+        return ('user', user.id)
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка обновлений с сохранением порядка внутри чата.
+
+    Обновления разных чатов выполняются одновременно (не более
+    max_concurrent_updates), обновления одного чата — строго по очереди,
+    поэтому диалоги через context.user_data['waiting_for'] не перемешиваются.
+    Ожидающие своей очереди обновления не занимают слоты выполнения; их общее
+    число ограничено max_pending.
+    """
+
+    def __init__(self, max_concurrent_updates=MAX_CONCURRENT_UPDATES, max_pending=MAX_PENDING_UPDATES):
+        # Семафор базового класса ограничивает число принятых обновлений,
+        # собственный — число выполняемых
+        super().__init__(max(max_pending, max_concurrent_updates))
+        self.limit = max_concurrent_updates
+        self._running = None
+        self._chats = {}  # ключ -> [asyncio.Lock, обновлений в очереди]
+
+    async def initialize(self):
+        self._running = asyncio.Semaphore(self.limit)
+
+    async def shutdown(self):
+        self._chats.clear()
+
+    async def do_process_update(self, update, coroutine):
+        key = chat_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+
+        slot = self._chats.get(key)
+        if slot is None:
+            slot = self._chats[key] = [asyncio.Lock(), 0]
+        slot[1] += 1
+        queued_at = time.perf_counter()
+        try:
+            async with slot[0]:
+                async with self._running:
+                    METRICS.observe('update_queue_wait', '', (time.perf_counter() - queued_at) * 1000)
+                    await coroutine
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._chats[key]
@@ -0,0 +1,353 @@
+import time
+from collections import OrderedDict
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
+from config import PAGE_SIZE, CACHE_TTL, VIEW_CACHE_SIZE, INLINE_CACHE_TIME, PROJECTS_SHEET, NOTES_SHEET
+from metrics import METRICS
+
+
+# Максимальная длина сообщения Telegram (в единицах UTF-16)
+MESSAGE_LIMIT = 4096
+
+STATUS_ICONS = {'done': "✅", 'in_progress': "⏳"}
+PRIORITY_ICONS = {'high': "🔴", 'medium': "🟡"}
+
+
+def status_icon(task):
+    return STATUS_ICONS.get(task['Status'], "📝")
+
+
+def priority_icon(task):
+    return PRIORITY_ICONS.get(task['Priority'], "🟢")
+
+
+def _units(text):
+    """Длина текста так, как ее считает Telegram"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def split_message(text, limit=MESSAGE_LIMIT):
+    """Разбить текст на части не длиннее limit, по возможности по границам строк"""
+    if _units(text) <= limit:
+        return [text]
+    chunks, lines, size = [], [], 0
+
+    def flush():
+        chunk = '\n'.join(lines).strip('\n')
+        if chunk:
+            chunks.append(chunk)
+        lines.clear()
+
+    for line in text.split('\n'):
+        length = _units(line)
+        if length > limit:
+            # Строка сама длиннее лимита — режем по символам
+            flush()
+            size, part = 0, []
+            for char in line:
+                char_units = _units(char)
+                if size + char_units > limit:
+                    chunks.append(''.join(part))
+                    size, part = 0, []
+                part.append(char)
+                size += char_units
+            line, length = ''.join(part), size
+            size = 0
+        elif size + length + 1 > limit:
+            flush()
+            size = 0
+        lines.append(line)
+        size += length + 1
+    flush()
+    return chunks
+
+
+# Кнопки перелистывания списков
+def page_buttons(prefix, page, total):
+    """Ряд кнопок ◀️/▶️ для страницы page; callback_data: <prefix>_page_<номер>"""
+    pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton("◀️ Назад", callback_data=f'{prefix}_page_{page - 1}'))
+    if page < pages - 1:
+        row.append(InlineKeyboardButton("Вперед ▶️", callback_data=f'{prefix}_page_{page + 1}'))
+    return row
+
+
+def page_title(page, total):
+    """Номер страницы для заголовка списка (пусто, если страница одна)"""
+    pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    return f" (стр. {page + 1}/{pages})" if pages > 1 else ""
+
+
+class ViewCache:
+    """Отрисованные экраны: текст, разбитый на сообщения, и клавиатура.
+
+    Экран действителен, пока не изменилась версия данных, из которых он
+    построен (Storage.data_version), и не старше ttl секунд — так же, как
+    кэш записей, он не видит правок, сделанных в таблице вручную.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_size=VIEW_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._views = OrderedDict()  # ключ -> (версия, время, части, клавиатура)
+
+    def get(self, key, version):
+        """(части, клавиатура) или None"""
+        view = self._views.get(key)
+        if view is None or view[0] != version or time.monotonic() - view[1] > self.ttl:
+            return None
+        self._views.move_to_end(key)
+        return view[2], view[3]
+
+    def set(self, key, version, chunks, markup):
+        self._views[key] = (version, time.monotonic(), chunks, markup)
+        self._views.move_to_end(key)
+        while len(self._views) > self.max_size:
+            self._views.popitem(last=False)
+
+    async def get_or_render(self, key, version, render):
+        """Экран из кэша или построенный render() -> (текст, кнопки) | None.
+
+        Версию нужно получить до чтения данных: если запись случится во время
+        отрисовки, экран сохранится под старой версией и не будет показан снова.
+        """
+        view = self.get(key, version)
+        if view is not None:
+            METRICS.inc('view_cache', 'hit')
+            return view
+        METRICS.inc('view_cache', 'miss')
+        rendered = await render()
+        if rendered is None:
+            return None
+        text, keyboard = rendered
+        view = (split_message(text), InlineKeyboardMarkup(keyboard))
+        self.set(key, version, *view)
+        return view
+
+
+VIEWS = ViewCache()
+# Ответы на inline-запросы: столько же, сколько их кэширует Telegram
+INLINE_VIEWS = ViewCache(ttl=INLINE_CACHE_TIME)
+
+
+def render_projects(projects, page, total):
+    if not projects:
+        return "📭 Нет проектов. Создайте первый!", [
+            [InlineKeyboardButton("➕ Создать проект", callback_data='create_project')],
+            [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
+        ]
+
+    parts = [f"📁 Ваши проекты{page_title(page, total)}:\n\n"]
+    for project in projects:
+        parts.append(f"🔹 {project['ID']}. {project['Name']}\n")
+        if project['Description']:
+            parts.append(f"   {project['Description']}\n")
+        parts.append("\n")
+
+    # Кнопки для каждого проекта страницы + перелистывание + главное меню
+    keyboard = [
+        [InlineKeyboardButton(f"📝 {project['Name']}", callback_data=f'project_tasks_{project["ID"]}')]
+        for project in projects
+    ]
+    navigation = page_buttons('projects', page, total)
+    if navigation:
+        keyboard.append(navigation)
+    keyboard.append([InlineKeyboardButton("➕ Создать проект", callback_data='create_project')])
+    keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')])
+    return ''.join(parts), keyboard
+
+
+def render_tasks(tasks, page, total):
+    keyboard = [
+        [InlineKeyboardButton("➕ Добавить задачу", callback_data='select_project_for_task')],
+        [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
+    ]
+    if not tasks:
+        return "📭 Нет задач. Создайте первую!", keyboard
+
+    # Группировка по проектам
+    projects = {}
+    for task in tasks:
+        projects.setdefault(task['Project'], []).append(task)
+
+    parts = [f"✅ Ваши задачи{page_title(page, total)}:\n\n"]
+    for project, project_tasks in projects.items():
+        parts.append(f"📁 {project}:\n")
+        for task in project_tasks:
+            parts.append(f"  {status_icon(task)} {priority_icon(task)} {task['ID']}. {task['Title']}\n")
+            if task['Deadline']:
+                parts.append(f"     📅 {task['Deadline']}\n")
+        parts.append("\n")
+
+    navigation = page_buttons('tasks', page, total)
+    if navigation:
+        keyboard.insert(0, navigation)
+    return ''.join(parts), keyboard
+
+
+def render_project_tasks(project_id, project_name, tasks):
+    if not tasks:
+        text = f"📭 Нет задач в проекте '{project_name}'"
+    else:
+        parts = [f"✅ Задачи проекта '{project_name}':\n\n"]
+        for task in tasks:
+            parts.append(f"{status_icon(task)} {priority_icon(task)} {task['ID']}. {task['Title']}\n")
+            if task['Description']:
+                parts.append(f"   {task['Description']}\n")
+            if task['Deadline']:
+                parts.append(f"   📅 {task['Deadline']}\n")
+            parts.append("\n")
+        text = ''.join(parts)
+
+    return text, [
+        [InlineKeyboardButton("➕ Добавить задачу", callback_data=f'add_task_to_project_{project_id}')],
+        [InlineKeyboardButton("🗄 Архив проекта", callback_data=f'project_archive_{project_id}')],
+        [InlineKeyboardButton("📋 Все проекты", callback_data='projects')],
+        [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
+    ]
+
+
+def render_archived_tasks(project_id, project_name, tasks):
+    """Последние PAGE_SIZE задач проекта из архива"""
+    keyboard = [
+        [InlineKeyboardButton("⬅️ Задачи проекта", callback_data=f'project_tasks_{project_id}')],
+        [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
+    ]
+    if not tasks:
+        return f"📭 В архиве проекта '{project_name}' нет задач", keyboard
+
+    shown = tasks[-PAGE_SIZE:]
+    parts = [f"🗄 Архив проекта '{project_name}'"]
+    if len(shown) < len(tasks):
+        parts.append(f" (последние {len(shown)} из {len(tasks)})")
+    parts.append(":\n\n")
+    for task in reversed(shown):
+        parts.append(f"✅ {task['ID']}. {task['Title']}\n")
+        parts.append(f"   📅 {task['Created']}\n\n")
+    parts.append("Подробнее: /archive <ID>")
+    return ''.join(parts), keyboard
+
+
+def render_archived_task(task):
+    text = f"🗄 Задача {task['ID']} (в архиве). {task['Title']}\n📁 {task['Project']}\n"
+    text += f"{status_icon(task)} {task['Status']} · {priority_icon(task)} {task['Priority']}\n"
+    if task['Description']:
+        text += f"{task['Description']}\n"
+    if task['Deadline']:
+        text += f"📅 Дедлайн: {task['Deadline']}\n"
+    return text + f"Создана: {task['Created']}"
+
+
+def render_notes(notes, page, total):
+    keyboard = [
+        [InlineKeyboardButton("➕ Добавить заметку", callback_data='add_note')],
+        [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
+    ]
+    if not notes:
+        return "📭 Нет заметок. Создайте первую!", keyboard
+
+    parts = [f"📝 Ваши заметки{page_title(page, total)}:\n\n"]
+    for note in notes:
+        parts.append(f"📌 {note['ID']}. {note['Title']}\n")
+        if note['Tags']:
+            parts.append(f"   🏷️ {note['Tags']}\n")
+        parts.append(f"   {note['Content'][:100]}{'...' if len(note['Content']) > 100 else ''}\n")
+        parts.append(f"   📅 {note['Created']}\n\n")
+
+    navigation = page_buttons('notes', page, total)
+    if navigation:
+        keyboard.insert(0, navigation)
+    return ''.join(parts), keyboard
+
+
+def render_secrets(secrets, page, total):
+    keyboard = [
+        [InlineKeyboardButton("➕ Добавить секрет", callback_data='add_secret')],
+        [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
+    ]
+    if not secrets:
+        return "📭 Нет секретов. Добавьте первый!", keyboard
+
+    parts = [f"🔐 Ваши секреты{page_title(page, total)}:\n\n"]
+    for secret in secrets:
+        parts.append(f"🔒 {secret['ID']}. {secret['Name']}\n")
+        if secret['Description']:
+            parts.append(f"   {secret['Description']}\n")
+        parts.append(f"   📅 {secret['Created']}\n\n")
+
+    navigation = page_buttons('secrets', page, total)
+    if navigation:
+        keyboard.insert(0, navigation)
+    return ''.join(parts), keyboard
+
+
+def render_search(query, results):
+    if not results:
+        return f"🔍 По запросу «{query}» ничего не найдено"
+
+    parts = [f"🔍 Результаты по запросу «{query}»:\n\n"]
+    for _, sheet_name, record in results:
+        if sheet_name == NOTES_SHEET:
+            content = str(record['Content'])
+            parts.append(f"📌 Заметка {record['ID']}. {record['Title']}\n")
+            parts.append(f"   {content[:100]}{'...' if len(content) > 100 else ''}\n\n")
+        else:
+            parts.append(f"📝 Задача {record['ID']}. {record['Title']}\n")
+            parts.append(f"   📁 {record['Project']}\n\n")
+    return ''.join(parts)
+
+
+def render_dashboard(projects, stats, today):
+    """Сводка по проектам: статусы, приоритеты невыполненных и просроченные задачи"""
+    keyboard = [
+        [InlineKeyboardButton("✅ Задачи", callback_data='tasks')],
+        [InlineKeyboardButton("🏠 Главное меню", callback_data='main_menu')],
+    ]
+    if not projects:
+        return "📭 Нет проектов. Создайте первый!", keyboard
+
+    parts = ["📊 Сводка по проектам\n\n"]
+    for project in projects:
+        project_stats = stats.project(project['Name'])
+        total = project_stats.total
+        parts.append(f"📁 {project['Name']} — задач: {total}\n")
+        if not total:
+            parts.append("\n")
+            continue
+        statuses = project_stats.statuses
+        done = statuses['done']
+        parts.append(f"   📝 {statuses['todo']} · ⏳ {statuses['in_progress']} · "
+                     f"✅ {done} ({done * 100 // total}%)\n")
+        priorities = project_stats.priorities
+        line = f"   🔴 {priorities['high']} · 🟡 {priorities['medium']} · 🟢 {priorities['low']}"
+        overdue = project_stats.overdue(today)
+        if overdue:
+            line += f" · ⚠️ просрочено {overdue}"
+        parts.append(line + "\n\n")
+    return ''.join(parts), keyboard
+
+
+def render_inline(results):
+    """Ответ на inline-запрос: статья на каждый найденный проект или задачу"""
+    articles = []
+    for _, sheet_name, record in results:
+        if sheet_name == PROJECTS_SHEET:
+            title = f"📁 {record['Name']}"
+            description = str(record['Description'])
+            text = f"📁 Проект {record['ID']}. {record['Name']}"
+            if record['Description']:
+                text += f"\n{record['Description']}"
+        else:
+            title = f"{status_icon(record)} {priority_icon(record)} {record['Title']}"
+            description = f"📁 {record['Project']}" + (f" · 📅 {record['Deadline']}" if record['Deadline'] else "")
+            text = f"{status_icon(record)} Задача {record['ID']}. {record['Title']}\n{description}"
+            if record['Description']:
+                text += f"\n{record['Description']}"
+        articles.append(InlineQueryResultArticle(
+            id=f"{sheet_name}_{record['ID']}",
+            title=title,
+            description=description[:100],
+            input_message_content=InputTextMessageContent(text[:MESSAGE_LIMIT]),
+        ))
+    return articles
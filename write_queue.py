@@ -0,0 +1,112 @@
+import threading
+from config import WRITE_FLUSH_INTERVAL, WRITE_FLUSH_SIZE
+from metrics import report_error
+from rate_limiter import background
+
+
+class WriteBehindQueue:
+    """Отложенная запись изменений в Google Sheets.
+
+    Добавления строк и изменения ячеек копятся в памяти и сбрасываются
+    одним append_rows / batch_update на лист — по таймеру или когда
+    накопилось flush_size изменений.
+    """
+
+    def __init__(self, write_batch, interval=WRITE_FLUSH_INTERVAL, flush_size=WRITE_FLUSH_SIZE):
+        self.write_batch = write_batch  # write_batch(лист, новые строки, {(строка, колонка): значение})
+        self.interval = interval
+        self.flush_size = flush_size
+        self._appends = {}  # лист -> [строки]
+        self._updates = {}  # лист -> {(строка, колонка): значение}
+        self._inflight = {}  # лист -> строки, которые сейчас записываются (номера строк еще неизвестны)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='sheets-writer', daemon=True)
+        self._thread.start()
+
+    def _size(self):
+        return sum(len(r) for r in self._appends.values()) + sum(len(u) for u in self._updates.values())
+
+    def append(self, sheet_name, *rows):
+        """Поставить строки в очередь на добавление"""
+        with self._lock:
+            self._appends.setdefault(sheet_name, []).extend(list(row) for row in rows)
+            if self._size() >= self.flush_size:
+                self._wakeup.set()
+
+    def update_pending(self, sheet_name, record_id, col, value):
+        """Изменить еще не записанную строку. True, если строка найдена в очереди.
+
+        Если строка как раз записывается, ждем окончания сброса: после него
+        она либо проиндексирована (False — ищите строку по ID), либо
+        вернулась в очередь после ошибки.
+        """
+        with self._lock:
+            for row in self._appends.get(sheet_name, []):
+                if str(row[0]) == str(record_id):
+                    row[col - 1] = value
+                    return True
+            inflight = any(str(row[0]) == str(record_id) for row in self._inflight.get(sheet_name, []))
+        if not inflight:
+            return False
+        with self._flush_lock:
+            pass
+        return self.update_pending(sheet_name, record_id, col, value)
+
+    def update(self, sheet_name, row, col, value):
+        """Поставить изменение ячейки в очередь"""
+        with self._lock:
+            self._updates.setdefault(sheet_name, {})[(row, col)] = value
+            if self._size() >= self.flush_size:
+                self._wakeup.set()
+
+    def pending(self, sheet_name=None):
+        """Есть ли незаписанные изменения"""
+        with self._lock:
+            if sheet_name is None:
+                return self._size() > 0
+            return bool(self._appends.get(sheet_name) or self._updates.get(sheet_name))
+
+    def flush(self, sheet_name=None):
+        """Записать накопленные изменения (одного листа или всех)"""
+        with self._flush_lock:
+            with self._lock:
+                names = [sheet_name] if sheet_name else list(set(self._appends) | set(self._updates))
+                batches = [(name, self._appends.pop(name, []), self._updates.pop(name, {})) for name in names]
+                for name, appends, _ in batches:
+                    if appends:
+                        self._inflight[name] = appends
+            for name, appends, updates in batches:
+                if not appends and not updates:
+                    continue
+                try:
+                    self.write_batch(name, appends, updates)
+                except Exception as e:
+                    report_error('write_behind', f"Ошибка пакетной записи в лист {name}: {e}")
+                    # Возвращаем изменения в очередь, повторим при следующем сбросе
+                    with self._lock:
+                        self._inflight.pop(name, None)
+                        self._appends[name] = appends + self._appends.get(name, [])
+                        newer = self._updates.get(name, {})
+                        self._updates[name] = {**updates, **newer}
+                    continue
+                # write_batch проиндексировал добавленные строки — их снова можно искать по ID
+                with self._lock:
+                    self._inflight.pop(name, None)
+
+    def _run(self):
+        # Фоновый сброс пропускает вперед запросы пользователей
+        with background():
+            while not self._stopped:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+                self.flush()
+
+    def stop(self):
+        """Остановить фоновый поток и записать остаток очереди"""
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()